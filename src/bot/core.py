@@ -25,7 +25,7 @@ from ..config.settings import Settings
 from ..exceptions import ClaudeCodeTelegramError
 from .features.registry import FeatureRegistry
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 class ClaudeCodeBot:
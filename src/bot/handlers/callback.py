@@ -9,7 +9,7 @@ from ...config.settings import Settings
 from ...security.audit import AuditLogger
 from ...security.validators import SecurityValidator
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 async def handle_callback_query(
@@ -13,7 +13,7 @@ from ...security.audit import AuditLogger
 from ...security.rate_limiter import RateLimiter
 from ...security.validators import SecurityValidator
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 async def _format_progress_update(update_obj) -> Optional[str]:
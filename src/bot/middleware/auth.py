@@ -5,7 +5,7 @@ from typing import Any, Callable, Dict
 
 import structlog
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 async def auth_middleware(handler: Callable, event: Any, data: Dict[str, Any]) -> Any:
@@ -4,7 +4,7 @@ from typing import Any, Callable, Dict
 
 import structlog
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 async def security_middleware(
@@ -8,6 +8,23 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from ...config.settings import Settings
 
+# Characters escaped outside code, applied in one str.translate pass
+_MARKDOWN_ESCAPES = str.maketrans({"_": r"\_", "*": r"\*"})
+
+_EXCESS_NEWLINES_RE = re.compile(r"\n{3,}")
+_CODE_BLOCK_RE = re.compile(r"```(\w+)?\n(.*?)```", re.DOTALL)
+
+_ERROR_ICONS = {
+    "Error": "❌",
+    "Warning": "⚠️",
+    "Info": "ℹ️",
+    "Security": "🛡️",
+    "Rate Limit": "⏱️",
+}
+
+_SPINNER_FRAMES = ("⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏")
+_DOTS_FRAMES = ("", ".", "..", "...")
+
 
 @dataclass
 class FormattedMessage:
@@ -83,13 +100,7 @@ class ResponseFormatter:
         self, error: str, error_type: str = "Error"
     ) -> FormattedMessage:
         """Format error message with appropriate styling."""
-        icon = {
-            "Error": "❌",
-            "Warning": "⚠️",
-            "Info": "ℹ️",
-            "Security": "🛡️",
-            "Rate Limit": "⏱️",
-        }.get(error_type, "❌")
+        icon = _ERROR_ICONS.get(error_type, "❌")
 
         text = f"{icon} **{error_type}**\n\n{error}"
 
@@ -138,17 +149,15 @@ class ResponseFormatter:
         if not files:
             text = f"📂 **{directory}**\n\n_(empty directory)_"
         else:
-            file_lines = []
-            for file in files[:50]:  # Limit to 50 items
-                if file.endswith("/"):
-                    file_lines.append(f"📁 {file}")
-                else:
-                    file_lines.append(f"📄 {file}")
-
-            file_text = "\n".join(file_lines)
+            # Limit to 50 items
+            file_lines = [
+                f"📁 {file}" if file.endswith("/") else f"📄 {file}"
+                for file in files[:50]
+            ]
             if len(files) > 50:
-                file_text += f"\n\n_... and {len(files) - 50} more items_"
+                file_lines.append(f"\n_... and {len(files) - 50} more items_")
 
+            file_text = "\n".join(file_lines)
             text = f"📂 **{directory}**\n\n{file_text}"
 
         return FormattedMessage(text, parse_mode="Markdown")
@@ -425,45 +434,51 @@ class ResponseFormatter:
 
     def _clean_text(self, text: str) -> str:
         """Clean text for Telegram display."""
-        # Remove excessive whitespace
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        # Remove excessive whitespace; stripping first is safe because escaping
+        # never adds or removes whitespace, and leaves less text to scan
+        text = text.strip()
+        if "\n\n\n" in text:
+            text = _EXCESS_NEWLINES_RE.sub("\n\n", text)
 
         # Escape special Markdown characters (but preserve intentional formatting)
         # Be careful not to escape characters inside code blocks
-        text = self._escape_markdown_outside_code(text)
-
-        return text.strip()
+        return self._escape_markdown_outside_code(text)
 
     def _escape_markdown_outside_code(self, text: str) -> str:
         """Escape Markdown characters outside of code blocks."""
         # This is a simplified approach - in practice, you might want more sophisticated parsing
-        parts = []
+        if "_" not in text and "*" not in text:
+            return text
+        if "`" not in text:
+            # No code blocks or inline code, so everything gets escaped
+            return text.translate(_MARKDOWN_ESCAPES)
+
+        parts: List[str] = []
+        append = parts.append
         in_code_block = False
-        in_inline_code = False
 
-        lines = text.split("\n")
-        for line in lines:
+        for line in text.split("\n"):
             if line.strip() == "```":
                 in_code_block = not in_code_block
-                parts.append(line)
+                append(line)
             elif in_code_block:
-                parts.append(line)
+                append(line)
+            elif "`" not in line:
+                append(line.translate(_MARKDOWN_ESCAPES))
             else:
-                # Handle inline code
+                # Handle inline code: even parts are outside backticks
                 line_parts = line.split("`")
-                for i, part in enumerate(line_parts):
-                    if i % 2 == 0:  # Outside inline code
-                        # Escape special characters
-                        part = part.replace("_", r"\_").replace("*", r"\*")
-                    line_parts[i] = part
-                parts.append("`".join(line_parts))
+                line_parts[::2] = [
+                    part.translate(_MARKDOWN_ESCAPES) for part in line_parts[::2]
+                ]
+                append("`".join(line_parts))
 
         return "\n".join(parts)
 
     def _format_code_blocks(self, text: str) -> str:
         """Ensure code blocks are properly formatted for Telegram."""
-        # Handle triple backticks with language specification
-        pattern = r"```(\w+)?\n(.*?)```"
+        if "```" not in text:
+            return text
 
         def replace_code_block(match):
             lang = match.group(1) or ""
@@ -480,77 +495,59 @@ class ResponseFormatter:
 
             return f"```\n{code}\n```"
 
-        return re.sub(pattern, replace_code_block, text, flags=re.DOTALL)
+        # Handle triple backticks with language specification
+        return _CODE_BLOCK_RE.sub(replace_code_block, text)
 
     def _split_message(self, text: str) -> List[FormattedMessage]:
         """Split long messages while preserving formatting."""
-        if len(text) <= self.max_message_length:
+        max_length = self.max_message_length
+        if len(text) <= max_length:
             return [FormattedMessage(text)]
 
         messages = []
-        current_lines = []
+        current_lines: List[str] = []
         current_length = 0
         in_code_block = False
+        # Very long lines are cut into pieces of this size
+        chunk_size = max_length - 100
 
-        lines = text.split("\n")
-
-        for line in lines:
+        for line in text.split("\n"):
             line_length = len(line) + 1  # +1 for newline
 
             # Check for code block markers
             if line.strip() == "```":
                 in_code_block = not in_code_block
 
-            # If this is a very long line that exceeds limit by itself, split it
-            if line_length > self.max_message_length:
-                # Split the line into chunks
-                chunks = []
-                for i in range(0, len(line), self.max_message_length - 100):
-                    chunks.append(line[i : i + self.max_message_length - 100])
-
-                for chunk in chunks:
-                    chunk_length = len(chunk) + 1
-
-                    if (
-                        current_length + chunk_length > self.max_message_length
-                        and current_lines
-                    ):
-                        # Save current message
-                        if in_code_block:
-                            current_lines.append("```")
-                        messages.append(FormattedMessage("\n".join(current_lines)))
-
-                        # Start new message
-                        current_lines = []
-                        current_length = 0
-                        if in_code_block:
-                            current_lines.append("```")
-                            current_length = 4
-
-                    current_lines.append(chunk)
-                    current_length += chunk_length
-                continue
+            # A line that exceeds the limit by itself is split into pieces
+            if line_length > max_length:
+                pieces = [
+                    line[i : i + chunk_size] for i in range(0, len(line), chunk_size)
+                ]
+            else:
+                pieces = [line]
 
-            # Check if adding this line would exceed the limit
-            if current_length + line_length > self.max_message_length and current_lines:
-                # Close code block if we're in one
-                if in_code_block:
-                    current_lines.append("```")
+            for piece in pieces:
+                length = len(piece) + 1
 
-                # Save current message
-                messages.append(FormattedMessage("\n".join(current_lines)))
+                # Check if adding this piece would exceed the limit
+                if current_length + length > max_length and current_lines:
+                    # Close code block if we're in one
+                    if in_code_block:
+                        current_lines.append("```")
 
-                # Start new message
-                current_lines = []
-                current_length = 0
+                    # Save current message
+                    messages.append(FormattedMessage("\n".join(current_lines)))
 
-                # Reopen code block if needed
-                if in_code_block:
-                    current_lines.append("```")
-                    current_length = 4  # Length of '```\n'
+                    # Start new message, reopening the code block if needed
+                    if in_code_block:
+                        current_lines = ["```"]
+                        current_length = 4  # Length of '```\n'
+                    else:
+                        current_lines = []
+                        current_length = 0
 
-            current_lines.append(line)
-            current_length += line_length
+                current_lines.append(piece)
+                current_length += length
 
         # Add remaining content
         if current_lines:
@@ -632,14 +629,12 @@ class ProgressIndicator:
     @staticmethod
     def create_spinner(step: int) -> str:
         """Create a spinning indicator."""
-        spinners = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
-        return spinners[step % len(spinners)]
+        return _SPINNER_FRAMES[step % len(_SPINNER_FRAMES)]
 
     @staticmethod
     def create_dots(step: int) -> str:
         """Create a dots indicator."""
-        dots = ["", ".", "..", "..."]
-        return dots[step % len(dots)]
+        return _DOTS_FRAMES[step % len(_DOTS_FRAMES)]
 
 
 class CodeHighlighter:
@@ -681,10 +676,12 @@ class CodeHighlighter:
     @classmethod
     def detect_language(cls, filename: str) -> str:
         """Detect programming language from filename."""
-        from pathlib import Path
-
-        ext = Path(filename).suffix.lower()
-        return cls.LANGUAGE_EXTENSIONS.get(ext, "")
+        # Suffix of the last path component, without building a Path per call
+        name = filename.rstrip("/").rpartition("/")[2]
+        dot = name.rfind(".")
+        if dot <= 0:
+            return ""
+        return cls.LANGUAGE_EXTENSIONS.get(name[dot:].lower(), "")
 
     @classmethod
     def format_code(cls, code: str, language: str = "", filename: str = "") -> str:
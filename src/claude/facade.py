@@ -3,6 +3,7 @@
 Provides simple interface for bot handlers.
 """
 
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Union
 
@@ -15,7 +16,7 @@ from .monitor import ToolMonitor
 from .sdk_integration import ClaudeSDKManager
 from .session import SessionManager
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 class ClaudeIntegration:
@@ -352,6 +353,8 @@ class ClaudeIntegration:
     async def get_user_sessions(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all sessions for a user."""
         sessions = await self.session_manager._get_user_sessions(user_id)
+        timeout_hours = self.config.session_timeout_hours
+        now = datetime.utcnow()
         return [
             {
                 "session_id": s.session_id,
@@ -360,8 +363,8 @@ class ClaudeIntegration:
                 "last_used": s.last_used.isoformat(),
                 "total_cost": s.total_cost,
                 "message_count": s.message_count,
-                "tools_used": s.tools_used,
-                "expired": s.is_expired(self.config.session_timeout_hours),
+                "tools_used": sorted(s.tools_used),
+                "expired": s.is_expired(timeout_hours, now),
             }
             for s in sessions
         ]
@@ -8,14 +8,28 @@ Features:
 """
 
 import asyncio
-import json
-import uuid
+import contextlib
+import inspect
+import logging
+import re
+import sys
+import weakref
 from asyncio.subprocess import Process
-from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
+import orjson
 import structlog
 
 from ..config.settings import Settings
@@ -25,10 +39,48 @@ from .exceptions import (
     ClaudeTimeoutError,
 )
 
-logger = structlog.get_logger()
+# Timeout context managers avoid the extra Task that wait_for() wraps around
+# the coroutine; async-timeout provides the same API before Python 3.11
+if sys.version_info >= (3, 11):
+    from asyncio import timeout as _timeout
+else:
+    # Only installed on Python < 3.11, but mypy checks this branch regardless
+    from async_timeout import timeout as _timeout  # type: ignore[import-not-found]
+
+logger = structlog.get_logger(__name__)
+
+# Stream-json lines start with their type, so it can be read without
+# deserializing the (possibly large) rest of the message
+_LEADING_TYPE_RE = re.compile(rb'\{\s*"type"\s*:\s*"([^"\\]+)"')
+
+# Message types the stream reader acts on; anything else is skipped unparsed.
+# Kept as bytes so the sniffed type is compared without decoding it
+_HANDLED_MESSAGE_TYPES = frozenset(
+    {b"assistant", b"tool_result", b"user", b"system", b"error", b"progress", b"result"}
+)
+
+# Reset time and timezone in the CLI's "usage limit reached" error
+_RESET_TIME_RE = re.compile(r"reset at (\d+[apm]+)", re.IGNORECASE)
+_TIMEZONE_RE = re.compile(r"\(([^)]+)\)")
+
+# Stdlib logger backing structlog, used to skip building debug events that
+# would be filtered out anyway
+_stdlib_logger = logging.getLogger(__name__)
+
+
+def _is_coroutine_callable(func: Callable) -> bool:
+    """Whether ``func`` is known to return a coroutine when called.
+
+    Looks through ``functools.wraps`` wrappers and at ``__call__`` so
+    callable objects with an ``async def __call__`` count as async.
+    """
+    func = inspect.unwrap(func)
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(
+        getattr(func, "__call__", None)
+    )
 
 
-@dataclass
+@dataclass(slots=True)
 class ClaudeResponse:
     """Response from Claude Code."""
 
@@ -42,9 +94,12 @@ class ClaudeResponse:
     tools_used: List[Dict[str, Any]] = field(default_factory=list)
 
 
-@dataclass
-class StreamUpdate:
-    """Enhanced streaming update from Claude with richer context."""
+class StreamUpdate(NamedTuple):
+    """Enhanced streaming update from Claude with richer context.
+
+    Updates are created for every streamed message and never mutated, so a
+    NamedTuple keeps them cheap to allocate.
+    """
 
     type: str  # 'assistant', 'user', 'system', 'result', 'tool_result', 'error', 'progress'
     content: Optional[str] = None
@@ -88,19 +143,88 @@ class StreamUpdate:
         return None
 
 
+class _AssistantTextBatcher:
+    """Coalesce assistant text updates that arrive within a short window.
+
+    Queued text is flushed early once it reaches ``max_chars`` so a fast
+    stream still produces updates of a bounded size.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[StreamUpdate], None],
+        interval: float,
+        max_chars: int = 4096,
+    ):
+        """Initialize batcher with the function that delivers updates."""
+        self._emit = emit
+        self._interval = interval
+        self._max_chars = max_chars
+        self._pending: List[StreamUpdate] = []
+        self._pending_chars = 0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def add(self, update: StreamUpdate) -> None:
+        """Queue a text update, scheduling a flush if none is pending."""
+        self._pending.append(update)
+        self._pending_chars += len(update.content or "")
+        if self._pending_chars >= self._max_chars:
+            self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after())
+
+    async def _flush_after(self) -> None:
+        """Flush queued updates once the batching window has passed."""
+        await asyncio.sleep(self._interval)
+        self._flush_task = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Deliver queued updates as a single combined update."""
+        self.cancel_timer()
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        self._pending_chars = 0
+        if len(pending) == 1:
+            self._emit(pending[0])
+        else:
+            self._emit(
+                pending[0]._replace(content="\n".join(u.content or "" for u in pending))
+            )
+
+    def cancel_timer(self) -> None:
+        """Cancel the scheduled flush, if any."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+
 class ClaudeProcessManager:
     """Manage Claude Code subprocess execution with memory optimization."""
 
     def __init__(self, config: Settings):
         """Initialize process manager with configuration."""
         self.config = config
-        self.active_processes: Dict[str, Process] = {}
+        # Keyed by pid; weak values so a missed cleanup can't keep a
+        # finished process object alive
+        self.active_processes: "weakref.WeakValueDictionary[int, Process]" = (
+            weakref.WeakValueDictionary()
+        )
 
         # Memory optimization settings
-        self.max_message_buffer = 1000  # Limit message history
         self.streaming_buffer_size = (
             65536  # 64KB streaming buffer for large JSON messages
         )
+        self.max_stderr_buffer = 256 * 1024  # Keep only the last 256KB of stderr
+
+        # Window and size limit for coalescing assistant text into one callback
+        self._flush_interval = 0.05
+        self._flush_max_chars = 4096
+
+        # Arguments after the prompt/session ones never change for a config
+        self._cmd_tail = self._build_command_tail()
 
     async def execute_command(
         self,
@@ -108,37 +232,37 @@ class ClaudeProcessManager:
         working_directory: Path,
         session_id: Optional[str] = None,
         continue_session: bool = False,
-        stream_callback: Optional[Callable[[StreamUpdate], None]] = None,
+        stream_callback: Optional[Callable[[StreamUpdate], Awaitable[None]]] = None,
     ) -> ClaudeResponse:
-        """Execute Claude Code command."""
+        """Execute Claude Code command.
+
+        ``stream_callback`` should be async: a coroutine function or an object
+        with an ``async def __call__``. Other callables run in the default
+        executor, and an awaitable they return is awaited on the loop.
+        """
         # Build command
         cmd = self._build_command(prompt, session_id, continue_session)
 
-        # Create process ID for tracking
-        process_id = str(uuid.uuid4())
-
         logger.info(
             "Starting Claude Code process",
-            process_id=process_id,
             working_directory=str(working_directory),
             session_id=session_id,
             continue_session=continue_session,
         )
 
+        process: Optional[Process] = None
         try:
             # Start process
             process = await self._start_process(cmd, working_directory)
-            self.active_processes[process_id] = process
+            self.active_processes[process.pid] = process
 
             # Handle output with timeout
-            result = await asyncio.wait_for(
-                self._handle_process_output(process, stream_callback),
-                timeout=self.config.claude_timeout_seconds,
-            )
+            async with _timeout(self.config.claude_timeout_seconds):
+                result = await self._handle_process_output(process, stream_callback)
 
             logger.info(
                 "Claude Code process completed successfully",
-                process_id=process_id,
+                pid=process.pid,
                 cost=result.cost,
                 duration_ms=result.duration_ms,
             )
@@ -147,13 +271,15 @@ class ClaudeProcessManager:
 
         except asyncio.TimeoutError:
             # Kill process on timeout
-            if process_id in self.active_processes:
-                self.active_processes[process_id].kill()
-                await self.active_processes[process_id].wait()
+            if process is not None:
+                # The child may already have exited on its own
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
+                await process.wait()
 
             logger.error(
                 "Claude Code process timed out",
-                process_id=process_id,
+                pid=process.pid if process else None,
                 timeout_seconds=self.config.claude_timeout_seconds,
             )
 
@@ -161,58 +287,72 @@ class ClaudeProcessManager:
                 f"Claude Code timed out after {self.config.claude_timeout_seconds}s"
             )
 
+        except asyncio.CancelledError:
+            # Don't leave the subprocess running if the caller gave up on us
+            if process is not None:
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
+
+            logger.warning(
+                "Claude Code process cancelled", pid=process.pid if process else None
+            )
+            raise
+
         except Exception as e:
             logger.error(
                 "Claude Code process failed",
-                process_id=process_id,
+                pid=process.pid if process else None,
                 error=str(e),
             )
             raise
 
         finally:
             # Clean up
-            if process_id in self.active_processes:
-                del self.active_processes[process_id]
+            if process is not None:
+                self.active_processes.pop(process.pid, None)
 
     def _build_command(
         self, prompt: str, session_id: Optional[str], continue_session: bool
     ) -> List[str]:
         """Build Claude Code command with arguments."""
-        cmd = [self.config.claude_binary_path or "claude"]
-
+        head: Tuple[str, ...]
         if continue_session and not prompt:
             # Continue existing session without new prompt
-            cmd.extend(["--continue"])
             if session_id:
-                cmd.extend(["--resume", session_id])
+                head = ("--continue", "--resume", session_id)
+            else:
+                head = ("--continue",)
         elif session_id and prompt and continue_session:
             # Follow-up message in existing session - use resume with new prompt
-            cmd.extend(["--resume", session_id, "-p", prompt])
+            head = ("--resume", session_id, "-p", prompt)
         elif prompt:
             # New session with prompt (including new sessions with session_id)
-            cmd.extend(["-p", prompt])
+            head = ("-p", prompt)
         else:
             # This shouldn't happen, but fallback to new session
-            cmd.extend(["-p", ""])
+            head = ("-p", "")
 
-        # Always use streaming JSON for real-time updates
-        cmd.extend(["--output-format", "stream-json"])
+        cmd = [self.config.claude_binary_path or "claude", *head, *self._cmd_tail]
+
+        if _stdlib_logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Built Claude Code command", command=cmd)
+        return cmd
 
-        # stream-json requires --verbose when using --print mode
-        cmd.extend(["--verbose"])
+    def _build_command_tail(self) -> Tuple[str, ...]:
+        """Build the arguments shared by every Claude Code command."""
+        # Always use streaming JSON for real-time updates; stream-json
+        # requires --verbose when using --print mode
+        tail: Tuple[str, ...] = ("--output-format", "stream-json", "--verbose")
 
         # Add safety limits
-        cmd.extend(["--max-turns", str(self.config.claude_max_turns)])
+        tail += ("--max-turns", str(self.config.claude_max_turns))
 
         # Add allowed tools if configured
-        if (
-            hasattr(self.config, "claude_allowed_tools")
-            and self.config.claude_allowed_tools
-        ):
-            cmd.extend(["--allowedTools", ",".join(self.config.claude_allowed_tools)])
+        allowed_tools = getattr(self.config, "claude_allowed_tools", None)
+        if allowed_tools:
+            tail += ("--allowedTools", ",".join(allowed_tools))
 
-        logger.debug("Built Claude Code command", command=cmd)
-        return cmd
+        return tail
 
     async def _start_process(self, cmd: List[str], cwd: Path) -> Process:
         """Start Claude Code subprocess."""
@@ -221,51 +361,123 @@ class ClaudeProcessManager:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=str(cwd),
-            # Limit memory usage
-            limit=1024 * 1024 * 512,  # 512MB
+            # High-water mark for the pipe readers: reading from the process
+            # pauses once this much output is buffered and not yet consumed
+            limit=self.config.claude_stdout_buffer_limit,
         )
 
     async def _handle_process_output(
         self, process: Process, stream_callback: Optional[Callable]
     ) -> ClaudeResponse:
         """Memory-optimized output handling with bounded buffers."""
-        message_buffer = deque(maxlen=self.max_message_buffer)
+        tools_used: List[Dict[str, Any]] = []
         result = None
         parsing_errors = []
+        callback_is_async = stream_callback is not None and _is_coroutine_callable(
+            stream_callback
+        )
 
-        async for line in self._read_stream_bounded(process.stdout):
-            try:
-                msg = json.loads(line)
+        # One consumer task delivers updates in arrival order, so the stdout
+        # reader keeps draining while a slow callback (a Telegram edit) runs
+        pending_updates: "asyncio.Queue[Optional[StreamUpdate]]" = asyncio.Queue()
+        consumer: Optional[asyncio.Task] = None
+
+        def emit(update: StreamUpdate) -> None:
+            nonlocal consumer
+            # Only reached from the branches that checked for a callback
+            assert stream_callback is not None
+            if consumer is None:
+                consumer = asyncio.create_task(
+                    self._deliver_stream_updates(
+                        stream_callback, pending_updates, callback_is_async
+                    )
+                )
+            pending_updates.put_nowait(update)
 
-                # Enhanced validation
-                if not self._validate_message_structure(msg):
-                    parsing_errors.append(f"Invalid message structure: {line[:100]}")
-                    continue
+        batcher = _AssistantTextBatcher(
+            emit, self._flush_interval, self._flush_max_chars
+        )
 
-                message_buffer.append(msg)
+        # Drain stderr alongside stdout so a chatty process can't block on a
+        # full stderr pipe while we are still reading stdout
+        stderr_task = asyncio.create_task(self._drain_stderr(process.stderr))
 
-                # Process immediately to avoid memory buildup
-                update = self._parse_stream_message(msg)
-                if update and stream_callback:
-                    try:
-                        await stream_callback(update)
-                    except Exception as e:
-                        logger.warning(
-                            "Stream callback failed",
-                            error=str(e),
-                            update_type=update.type,
+        try:
+            async for line in self._read_stream_bounded(process.stdout):
+                # Skip message types we don't handle before paying for a parse
+                type_match = _LEADING_TYPE_RE.match(line)
+                if type_match and type_match.group(1) not in _HANDLED_MESSAGE_TYPES:
+                    if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "Skipping unhandled message type",
+                            msg_type=type_match.group(1).decode(
+                                "utf-8", errors="replace"
+                            ),
                         )
+                    continue
 
-                # Check for final result
-                if msg.get("type") == "result":
-                    result = msg
+                try:
+                    try:
+                        msg = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # orjson rejects invalid UTF-8 outright; replacing the
+                        # bad bytes still recovers an otherwise valid message
+                        msg = orjson.loads(line.decode("utf-8", errors="replace"))
+
+                    # Every message must carry a type to be dispatched
+                    msg_type = msg.get("type") if isinstance(msg, dict) else None
+                    if not msg_type:
+                        preview = line[:100].decode("utf-8", errors="replace")
+                        parsing_errors.append(f"Invalid message structure: {preview}")
+                        continue
+
+                    # Process immediately to avoid memory buildup
+                    update = self._parse_stream_message(msg, msg_type)
+
+                    if update is not None:
+                        # Collect tool usage now so messages needn't be kept
+                        if msg_type == "assistant" and update.tool_calls:
+                            tools_used.extend(
+                                {"name": call["name"], "timestamp": update.timestamp}
+                                for call in update.tool_calls
+                            )
+                        if stream_callback:
+                            if (
+                                update.type == "assistant"
+                                and update.content
+                                and not update.tool_calls
+                            ):
+                                batcher.add(update)
+                            else:
+                                # Keep ordering: queued text goes out first
+                                batcher.flush()
+                                emit(update)
+
+                    # Check for final result
+                    if msg_type == "result":
+                        result = msg
+
+                except orjson.JSONDecodeError as e:
+                    parsing_errors.append(f"JSON decode error: {e}")
+                    logger.warning(
+                        "Failed to parse JSON line",
+                        line=line[:200].decode("utf-8", errors="replace"),
+                        error=str(e),
+                    )
+                    continue
+        except BaseException:
+            # Timed out or cancelled: don't leave callbacks running unattended
+            batcher.cancel_timer()
+            if consumer is not None:
+                consumer.cancel()
+            stderr_task.cancel()
+            raise
 
-            except json.JSONDecodeError as e:
-                parsing_errors.append(f"JSON decode error: {e}")
-                logger.warning(
-                    "Failed to parse JSON line", line=line[:200], error=str(e)
-                )
-                continue
+        # Let queued updates be delivered before reporting the result
+        batcher.flush()
+        if consumer is not None:
+            pending_updates.put_nowait(None)
+            await consumer
 
         # Enhanced error reporting
         if parsing_errors:
@@ -277,9 +489,9 @@ class ClaudeProcessManager:
 
         # Wait for process to complete
         return_code = await process.wait()
+        stderr = await stderr_task
 
         if return_code != 0:
-            stderr = await process.stderr.read()
             error_msg = stderr.decode("utf-8", errors="replace")
             logger.error(
                 "Claude Code process failed",
@@ -290,12 +502,8 @@ class ClaudeProcessManager:
             # Check for specific error types
             if "usage limit reached" in error_msg.lower():
                 # Extract reset time if available
-                import re
-
-                time_match = re.search(
-                    r"reset at (\d+[apm]+)", error_msg, re.IGNORECASE
-                )
-                timezone_match = re.search(r"\(([^)]+)\)", error_msg)
+                time_match = _RESET_TIME_RE.search(error_msg)
+                timezone_match = _TIMEZONE_RE.search(error_msg)
 
                 reset_time = time_match.group(1) if time_match else "later"
                 timezone = timezone_match.group(1) if timezone_match else ""
@@ -324,19 +532,70 @@ class ClaudeProcessManager:
             logger.error("No result message received from Claude Code")
             raise ClaudeParsingError("No result message received from Claude Code")
 
-        return self._parse_result(result, list(message_buffer))
+        return self._parse_result(result, tools_used)
 
-    async def _read_stream(self, stream) -> AsyncIterator[str]:
-        """Read lines from stream."""
+    async def _deliver_stream_updates(
+        self,
+        stream_callback: Callable,
+        updates: "asyncio.Queue[Optional[StreamUpdate]]",
+        is_async: bool = True,
+    ) -> None:
+        """Pass queued updates to the callback one at a time until ``None``."""
         while True:
-            line = await stream.readline()
-            if not line:
+            update = await updates.get()
+            if update is None:
+                return
+            await self._run_stream_callback(stream_callback, update, is_async)
+
+    async def _run_stream_callback(
+        self, stream_callback: Callable, update: StreamUpdate, is_async: bool = True
+    ) -> None:
+        """Run a stream callback without letting its failure stop the reader."""
+        try:
+            if is_async:
+                result = stream_callback(update)
+            else:
+                # Sync callbacks run off the loop so they can't stall it
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, stream_callback, update
+                )
+            # Some wrapped coroutine functions only reveal it by their result
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.warning(
+                "Stream callback failed",
+                error=str(e),
+                update_type=update.type,
+            )
+
+    async def _drain_stderr(self, stream) -> bytes:
+        """Read stderr to EOF, keeping only the most recent bytes.
+
+        At most ``max_stderr_buffer`` bytes are retained; older output is
+        discarded as it arrives so a very chatty process can't grow memory.
+        """
+        buffer = bytearray()
+
+        while True:
+            chunk = await stream.read(self.streaming_buffer_size)
+            if not chunk:
                 break
-            yield line.decode("utf-8", errors="replace").strip()
 
-    async def _read_stream_bounded(self, stream) -> AsyncIterator[str]:
-        """Read stream with memory bounds to prevent excessive memory usage."""
-        buffer = b""
+            buffer += chunk
+            if len(buffer) > self.max_stderr_buffer:
+                del buffer[: len(buffer) - self.max_stderr_buffer]
+
+        return bytes(buffer)
+
+    async def _read_stream_bounded(self, stream) -> AsyncIterator[bytes]:
+        """Read stream with memory bounds to prevent excessive memory usage.
+
+        Reads fixed-size chunks rather than awaiting one readline() per
+        message, and splits every complete line out of a chunk in one pass.
+        Lines are yielded as raw bytes so they can be parsed without decoding.
+        """
+        buffer = bytearray()
 
         while True:
             chunk = await stream.read(self.streaming_buffer_size)
@@ -345,18 +604,32 @@ class ClaudeProcessManager:
 
             buffer += chunk
 
-            # Process complete lines
-            while b"\n" in buffer:
-                line, buffer = buffer.split(b"\n", 1)
-                yield line.decode("utf-8", errors="replace").strip()
+            # Process complete lines; NDJSON only needs a CRLF trimmed
+            start = 0
+            while True:
+                end = buffer.find(b"\n", start)
+                if end < 0:
+                    break
+                line = buffer[start:end].rstrip(b"\r")
+                start = end + 1
+                if line:
+                    yield bytes(line)
+
+            # Drop consumed bytes once per chunk instead of once per line
+            if start:
+                del buffer[:start]
 
         # Process remaining buffer
+        buffer = buffer.rstrip(b"\r")
         if buffer:
-            yield buffer.decode("utf-8", errors="replace").strip()
+            yield bytes(buffer)
 
-    def _parse_stream_message(self, msg: Dict) -> Optional[StreamUpdate]:
+    def _parse_stream_message(
+        self, msg: Dict, msg_type: Optional[str] = None
+    ) -> Optional[StreamUpdate]:
         """Enhanced parsing with comprehensive message type support."""
-        msg_type = msg.get("type")
+        if msg_type is None:
+            msg_type = msg.get("type")
 
         # Add support for more message types
         if msg_type == "assistant":
@@ -373,7 +646,8 @@ class ClaudeProcessManager:
             return self._parse_progress_message(msg)
 
         # Unknown message type - log and continue
-        logger.debug("Unknown message type", msg_type=msg_type, msg=msg)
+        if _stdlib_logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Unknown message type", msg_type=msg_type, keys=sorted(msg))
         return None
 
     def _parse_assistant_message(self, msg: Dict) -> StreamUpdate:
@@ -381,13 +655,18 @@ class ClaudeProcessManager:
         message = msg.get("message", {})
         content_blocks = message.get("content", [])
 
-        # Get text content
+        # Get text content; most messages carry a single text block, so only
+        # promote to a list once a second block shows up
+        first_text: Optional[str] = None
         text_content = []
         tool_calls = []
 
         for block in content_blocks:
             if block.get("type") == "text":
-                text_content.append(block.get("text", ""))
+                if first_text is None:
+                    first_text = block.get("text", "")
+                else:
+                    text_content.append(block.get("text", ""))
             elif block.get("type") == "tool_use":
                 tool_calls.append(
                     {
@@ -397,9 +676,16 @@ class ClaudeProcessManager:
                     }
                 )
 
+        if first_text is None:
+            content = None
+        elif not text_content:
+            content = first_text
+        else:
+            content = first_text + "\n" + "\n".join(text_content)
+
         return StreamUpdate(
             type="assistant",
-            content="\n".join(text_content) if text_content else None,
+            content=content,
             tool_calls=tool_calls if tool_calls else None,
             timestamp=msg.get("timestamp"),
             session_context={"session_id": msg.get("session_id")},
@@ -437,13 +723,26 @@ class ClaudeProcessManager:
 
         # Handle both string and block format content
         if isinstance(content, list):
+            first_text: Optional[str] = None
             text_parts = []
             for block in content:
                 if isinstance(block, dict) and block.get("type") == "text":
-                    text_parts.append(block.get("text", ""))
+                    text = block.get("text", "")
                 elif isinstance(block, str):
-                    text_parts.append(block)
-            content = "\n".join(text_parts)
+                    text = block
+                else:
+                    continue
+                if first_text is None:
+                    first_text = text
+                else:
+                    text_parts.append(text)
+
+            if first_text is None:
+                content = ""
+            elif not text_parts:
+                content = first_text
+            else:
+                content = first_text + "\n" + "\n".join(text_parts)
 
         return StreamUpdate(
             type="user",
@@ -511,27 +810,10 @@ class ClaudeProcessManager:
             session_context={"session_id": msg.get("session_id")},
         )
 
-    def _validate_message_structure(self, msg: Dict) -> bool:
-        """Validate message has required structure."""
-        required_fields = ["type"]
-        return all(field in msg for field in required_fields)
-
-    def _parse_result(self, result: Dict, messages: List[Dict]) -> ClaudeResponse:
+    def _parse_result(
+        self, result: Dict, tools_used: List[Dict[str, Any]]
+    ) -> ClaudeResponse:
         """Parse final result message."""
-        # Extract tools used from messages
-        tools_used = []
-        for msg in messages:
-            if msg.get("type") == "assistant":
-                message = msg.get("message", {})
-                for block in message.get("content", []):
-                    if block.get("type") == "tool_use":
-                        tools_used.append(
-                            {
-                                "name": block.get("name"),
-                                "timestamp": msg.get("timestamp"),
-                            }
-                        )
-
         return ClaudeResponse(
             content=result.get("result", ""),
             session_id=result.get("session_id", ""),
@@ -549,15 +831,14 @@ class ClaudeProcessManager:
             "Killing all active Claude processes", count=len(self.active_processes)
         )
 
-        for process_id, process in self.active_processes.items():
+        for process in list(self.active_processes.values()):
             try:
-                process.kill()
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
                 await process.wait()
-                logger.info("Killed Claude process", process_id=process_id)
+                logger.info("Killed Claude process", pid=process.pid)
             except Exception as e:
-                logger.warning(
-                    "Failed to kill process", process_id=process_id, error=str(e)
-                )
+                logger.warning("Failed to kill process", pid=process.pid, error=str(e))
 
         self.active_processes.clear()
 
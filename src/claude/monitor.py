@@ -6,16 +6,96 @@ Features:
 - Usage analytics
 """
 
-from collections import defaultdict
+import logging
+import re
+from collections import Counter, defaultdict, deque
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Deque, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
 
 import structlog
 
 from ..config.settings import Settings
 from ..security.validators import SecurityValidator
+from ..utils.constants import DEFAULT_MAX_VIOLATIONS_RETAINED
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
+
+# Stdlib logger backing structlog, used to skip building debug events that
+# would be filtered out anyway
+_stdlib_logger = logging.getLogger(__name__)
+
+# Tools whose input names a file that must stay inside the working directory
+_FILE_TOOLS = frozenset(
+    {"create_file", "edit_file", "read_file", "Write", "Edit", "Read"}
+)
+
+# Tools that run shell commands
+_SHELL_TOOLS = frozenset({"bash", "shell", "Bash"})
+
+# Shell command fragments that are never allowed; ">>" precedes ">" so the
+# longer operator is reported when both would match
+DANGEROUS_COMMAND_PATTERNS = (
+    "rm -rf",
+    "sudo",
+    "chmod 777",
+    "curl",
+    "wget",
+    "nc ",
+    "netcat",
+    ">>",
+    ">",
+    "|",
+    "&",
+    ";",
+    "$(",
+    "`",
+)
+
+# Single case-insensitive pass over the command instead of one scan per pattern.
+# An alternation of literals lets re skip ahead to positions starting with one
+# of the patterns' first characters, so the scan stays linear as the list grows
+_DANGEROUS_COMMAND_RE = re.compile(
+    "|".join(re.escape(pattern) for pattern in DANGEROUS_COMMAND_PATTERNS),
+    re.IGNORECASE,
+)
+
+# Most commands contain no shell operators; for those only the word patterns
+# can match, so a cheap character-class probe lets us search a shorter regex
+_WORD_PATTERNS = tuple(p for p in DANGEROUS_COMMAND_PATTERNS if p[0].isalpha())
+_OPERATOR_START_RE = re.compile(
+    "["
+    + re.escape(
+        "".join(
+            sorted({p[0] for p in DANGEROUS_COMMAND_PATTERNS if not p[0].isalpha()})
+        )
+    )
+    + "]"
+)
+_DANGEROUS_WORD_RE = re.compile(
+    "|".join(re.escape(pattern) for pattern in _WORD_PATTERNS), re.IGNORECASE
+)
+
+
+class ToolViolation(NamedTuple):
+    """Security violation recorded while validating a tool call.
+
+    Kept as a tuple while retained; converted to a dict only when queried.
+    """
+
+    type: str
+    tool_name: str
+    user_id: int
+    working_directory: str
+    command: Optional[str] = None
+    pattern: Optional[str] = None
+    file_path: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a dict, omitting fields that don't apply."""
+        return {
+            name: value for name, value in zip(self._fields, self) if value is not None
+        }
 
 
 class ToolMonitor:
@@ -27,8 +107,27 @@ class ToolMonitor:
         """Initialize tool monitor."""
         self.config = config
         self.security_validator = security_validator
-        self.tool_usage: Dict[str, int] = defaultdict(int)
-        self.security_violations: List[Dict[str, Any]] = []
+        self.tool_usage: Counter[str] = Counter()
+        # Only the most recent violations are kept; per-user totals live in
+        # _violations_by_user so they survive eviction from the ring buffer
+        self.security_violations: Deque[ToolViolation] = deque(
+            maxlen=getattr(
+                config, "max_violations_retained", DEFAULT_MAX_VIOLATIONS_RETAINED
+            )
+        )
+        self._violations_by_user: Dict[int, Dict[str, Any]] = defaultdict(
+            lambda: {"count": 0, "types": set()}
+        )
+
+        # Tool lists are fixed for the lifetime of the config; None means unset
+        allowed = getattr(config, "claude_allowed_tools", None)
+        disallowed = getattr(config, "claude_disallowed_tools", None)
+        self._allowed_tools: Optional[FrozenSet[str]] = (
+            frozenset(allowed) if allowed else None
+        )
+        self._disallowed_tools: Optional[FrozenSet[str]] = (
+            frozenset(disallowed) if disallowed else None
+        )
 
     async def validate_tool_call(
         self,
@@ -38,54 +137,40 @@ class ToolMonitor:
         user_id: int,
     ) -> Tuple[bool, Optional[str]]:
         """Validate tool call before execution."""
-        logger.debug(
-            "Validating tool call",
-            tool_name=tool_name,
-            working_directory=str(working_directory),
-            user_id=user_id,
-        )
+        debug_enabled = _stdlib_logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug(
+                "Validating tool call",
+                tool_name=tool_name,
+                working_directory=str(working_directory),
+                user_id=user_id,
+            )
 
         # Check if tool is allowed
-        if (
-            hasattr(self.config, "claude_allowed_tools")
-            and self.config.claude_allowed_tools
-        ):
-            if tool_name not in self.config.claude_allowed_tools:
-                violation = {
-                    "type": "disallowed_tool",
-                    "tool_name": tool_name,
-                    "user_id": user_id,
-                    "working_directory": str(working_directory),
-                }
-                self.security_violations.append(violation)
-                logger.warning("Tool not allowed", **violation)
+        if self._allowed_tools is not None:
+            if tool_name not in self._allowed_tools:
+                violation = ToolViolation(
+                    "disallowed_tool", tool_name, user_id, str(working_directory)
+                )
+                self._record_violation(violation)
+                logger.warning("Tool not allowed", **violation.to_dict())
                 return False, f"Tool not allowed: {tool_name}"
 
         # Check if tool is explicitly disallowed
-        if (
-            hasattr(self.config, "claude_disallowed_tools")
-            and self.config.claude_disallowed_tools
-        ):
-            if tool_name in self.config.claude_disallowed_tools:
-                violation = {
-                    "type": "explicitly_disallowed_tool",
-                    "tool_name": tool_name,
-                    "user_id": user_id,
-                    "working_directory": str(working_directory),
-                }
-                self.security_violations.append(violation)
-                logger.warning("Tool explicitly disallowed", **violation)
+        if self._disallowed_tools is not None:
+            if tool_name in self._disallowed_tools:
+                violation = ToolViolation(
+                    "explicitly_disallowed_tool",
+                    tool_name,
+                    user_id,
+                    str(working_directory),
+                )
+                self._record_violation(violation)
+                logger.warning("Tool explicitly disallowed", **violation.to_dict())
                 return False, f"Tool explicitly disallowed: {tool_name}"
 
         # Validate file operations
-        if tool_name in [
-            "create_file",
-            "edit_file",
-            "read_file",
-            "Write",
-            "Edit",
-            "Read",
-        ]:
+        if tool_name in _FILE_TOOLS:
             file_path = tool_input.get("path") or tool_input.get("file_path")
             if not file_path:
                 return False, "File path required"
@@ -97,64 +182,61 @@ class ToolMonitor:
                 )
 
                 if not valid:
-                    violation = {
-                        "type": "invalid_file_path",
-                        "tool_name": tool_name,
-                        "file_path": file_path,
-                        "user_id": user_id,
-                        "working_directory": str(working_directory),
-                        "error": error,
-                    }
-                    self.security_violations.append(violation)
-                    logger.warning("Invalid file path in tool call", **violation)
+                    violation = ToolViolation(
+                        "invalid_file_path",
+                        tool_name,
+                        user_id,
+                        str(working_directory),
+                        file_path=file_path,
+                        error=error,
+                    )
+                    self._record_violation(violation)
+                    logger.warning(
+                        "Invalid file path in tool call", **violation.to_dict()
+                    )
                     return False, error
 
         # Validate shell commands
-        if tool_name in ["bash", "shell", "Bash"]:
+        if tool_name in _SHELL_TOOLS:
             command = tool_input.get("command", "")
 
             # Check for dangerous commands
-            dangerous_patterns = [
-                "rm -rf",
-                "sudo",
-                "chmod 777",
-                "curl",
-                "wget",
-                "nc ",
-                "netcat",
-                ">",
-                ">>",
-                "|",
-                "&",
-                ";",
-                "$(",
-                "`",
-            ]
-
-            for pattern in dangerous_patterns:
-                if pattern in command.lower():
-                    violation = {
-                        "type": "dangerous_command",
-                        "tool_name": tool_name,
-                        "command": command,
-                        "pattern": pattern,
-                        "user_id": user_id,
-                        "working_directory": str(working_directory),
-                    }
-                    self.security_violations.append(violation)
-                    logger.warning("Dangerous command detected", **violation)
-                    return False, f"Dangerous command pattern detected: {pattern}"
+            if _OPERATOR_START_RE.search(command):
+                match = _DANGEROUS_COMMAND_RE.search(command)
+            else:
+                match = _DANGEROUS_WORD_RE.search(command)
+            if match:
+                pattern = match.group(0).lower()
+                violation = ToolViolation(
+                    "dangerous_command",
+                    tool_name,
+                    user_id,
+                    str(working_directory),
+                    command=command,
+                    pattern=pattern,
+                )
+                self._record_violation(violation)
+                logger.warning("Dangerous command detected", **violation.to_dict())
+                return False, f"Dangerous command pattern detected: {pattern}"
 
         # Track usage
         self.tool_usage[tool_name] += 1
 
-        logger.debug("Tool call validated successfully", tool_name=tool_name)
+        if debug_enabled:
+            logger.debug("Tool call validated successfully", tool_name=tool_name)
         return True, None
 
+    def _record_violation(self, violation: ToolViolation) -> None:
+        """Store a violation and update the per-user counters."""
+        self.security_violations.append(violation)
+        record = self._violations_by_user[violation.user_id]
+        record["count"] += 1
+        record["types"].add(violation.type)
+
     def get_tool_stats(self) -> Dict[str, Any]:
         """Get tool usage statistics."""
         return {
-            "total_calls": sum(self.tool_usage.values()),
+            "total_calls": self.tool_usage.total(),
             "by_tool": dict(self.tool_usage),
             "unique_tools": len(self.tool_usage),
             "security_violations": len(self.security_violations),
@@ -162,42 +244,34 @@ class ToolMonitor:
 
     def get_security_violations(self) -> List[Dict[str, Any]]:
         """Get security violations."""
-        return self.security_violations.copy()
+        return [violation.to_dict() for violation in self.security_violations]
 
     def reset_stats(self) -> None:
         """Reset statistics."""
         self.tool_usage.clear()
         self.security_violations.clear()
+        self._violations_by_user.clear()
         logger.info("Tool monitor statistics reset")
 
     def get_user_tool_usage(self, user_id: int) -> Dict[str, Any]:
         """Get tool usage for specific user."""
-        user_violations = [
-            v for v in self.security_violations if v.get("user_id") == user_id
-        ]
+        record = self._violations_by_user.get(user_id)
+        types: Set[str] = record["types"] if record else set()
 
         return {
             "user_id": user_id,
-            "security_violations": len(user_violations),
-            "violation_types": list(set(v.get("type") for v in user_violations)),
+            "security_violations": record["count"] if record else 0,
+            "violation_types": list(types),
         }
 
     def is_tool_allowed(self, tool_name: str) -> bool:
         """Check if tool is allowed without validation."""
         # Check allowed list
-        if (
-            hasattr(self.config, "claude_allowed_tools")
-            and self.config.claude_allowed_tools
-        ):
-            if tool_name not in self.config.claude_allowed_tools:
-                return False
+        if self._allowed_tools is not None and tool_name not in self._allowed_tools:
+            return False
 
         # Check disallowed list
-        if (
-            hasattr(self.config, "claude_disallowed_tools")
-            and self.config.claude_disallowed_tools
-        ):
-            if tool_name in self.config.claude_disallowed_tools:
-                return False
+        if self._disallowed_tools is not None and tool_name in self._disallowed_tools:
+            return False
 
         return True
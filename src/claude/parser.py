@@ -7,61 +7,126 @@ Features:
 - Tool extraction
 """
 
-import json
+import io
 import re
-from typing import Any, Dict, List
+from typing import Any, AnyStr, Dict, Iterable, Iterator, List, Union
 
+import orjson
 import structlog
 
 from .exceptions import ClaudeParsingError
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
+
+# Tool names counted as file operations and shell commands
+_FILE_TOOLS = frozenset(
+    {"create_file", "edit_file", "read_file", "Write", "Edit", "Read"}
+)
+_SHELL_TOOLS = frozenset({"bash", "shell", "Bash"})
+
+# Summary returned for a session without messages
+_EMPTY_SUMMARY = {
+    "total_messages": 0,
+    "assistant_messages": 0,
+    "user_messages": 0,
+    "tool_calls": 0,
+    "tool_results": 0,
+    "errors": 0,
+    "code_blocks": 0,
+    "file_operations": 0,
+    "shell_commands": 0,
+}
+
+# Language tag allowed on an opening code fence
+_FENCE_LANGUAGE_RE = re.compile(r"\w*")
 
 
 class OutputParser:
     """Parse various Claude Code output formats."""
 
     @staticmethod
-    def parse_json_output(output: str) -> Dict[str, Any]:
+    def parse_json_output(output: Union[str, bytes]) -> Dict[str, Any]:
         """Parse single JSON output."""
         try:
-            return json.loads(output)
-        except json.JSONDecodeError as e:
+            return orjson.loads(output)
+        except orjson.JSONDecodeError as e:
             logger.error(
                 "Failed to parse JSON output", output=output[:200], error=str(e)
             )
-            raise ClaudeParsingError(f"Failed to parse JSON output: {e}")
+            raise ClaudeParsingError(f"Failed to parse JSON output: {e}") from e
 
     @staticmethod
-    def parse_stream_json(lines: List[str]) -> List[Dict[str, Any]]:
+    def parse_stream_json(lines: Iterable[Union[str, bytes]]) -> List[Dict[str, Any]]:
         """Parse streaming JSON output."""
-        messages = []
+        return list(OutputParser._iter_json_lines(lines))
+
+    @staticmethod
+    def parse_stream_json_iter(buffer: AnyStr) -> Iterator[Dict[str, Any]]:
+        """Lazily parse newline-delimited JSON from a single buffer."""
+        return OutputParser._iter_json_lines(OutputParser._iter_lines(buffer))
+
+    @staticmethod
+    def _iter_lines(buffer: AnyStr) -> Iterator[AnyStr]:
+        """Yield the lines of a buffer one at a time, without a line list."""
+        # Split on "\n" only; str.splitlines() would also break on separators
+        # such as U+2028 that may appear unescaped inside JSON strings
+        # mypy checks str and bytes separately, so each sees a single type here
+        newline = b"\n" if isinstance(buffer, bytes) else "\n"
+        start = 0
+        while True:
+            end = buffer.find(newline, start)
+            if end < 0:
+                yield buffer[start:]
+                return
+            yield buffer[start:end]
+            start = end + 1
 
+    @staticmethod
+    def _iter_json_lines(
+        lines: Iterable[Union[str, bytes]],
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield parsed JSON lines, skipping blank and invalid ones."""
         for line in lines:
             line = line.strip()
             if not line:
                 continue
 
             try:
-                msg = json.loads(line)
-                messages.append(msg)
-            except json.JSONDecodeError:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
                 logger.warning("Skipping invalid JSON line", line=line)
                 continue
 
-        return messages
-
     @staticmethod
     def extract_code_blocks(content: str) -> List[Dict[str, str]]:
         """Extract code blocks from response."""
         code_blocks = []
-        pattern = r"```(\w+)?\n(.*?)```"
 
-        for match in re.finditer(pattern, content, re.DOTALL):
-            language = match.group(1) or "text"
-            code = match.group(2).strip()
+        # Locate fences with str.find rather than a lazy regex so long or
+        # malformed markdown is scanned once without backtracking
+        pos = 0
+        while True:
+            start = content.find("```", pos)
+            if start < 0:
+                break
+
+            newline = content.find("\n", start + 3)
+            if newline < 0:
+                break
+
+            language = content[start + 3 : newline]
+            if not _FENCE_LANGUAGE_RE.fullmatch(language):
+                # Not an opening fence; one may still start further along
+                pos = start + 1
+                continue
 
-            code_blocks.append({"language": language, "code": code})
+            end = content.find("```", newline + 1)
+            if end < 0:
+                break
+
+            code = content[newline + 1 : end].strip()
+            code_blocks.append({"language": language or "text", "code": code})
+            pos = end + 3
 
         logger.debug("Extracted code blocks", count=len(code_blocks))
         return code_blocks
@@ -69,7 +134,8 @@ class OutputParser:
     @staticmethod
     def extract_file_operations(messages: List[Dict]) -> List[Dict[str, Any]]:
         """Extract file operations from tool calls."""
-        file_ops = []
+        file_ops: List[Dict[str, Any]] = []
+        append = file_ops.append
 
         for msg in messages:
             if msg.get("type") != "assistant":
@@ -84,15 +150,8 @@ class OutputParser:
                 tool_input = block.get("input", {})
 
                 # Check for file-related tools
-                if tool_name in [
-                    "create_file",
-                    "edit_file",
-                    "read_file",
-                    "Write",
-                    "Edit",
-                    "Read",
-                ]:
-                    file_ops.append(
+                if tool_name in _FILE_TOOLS:
+                    append(
                         {
                             "operation": tool_name,
                             "path": tool_input.get("path")
@@ -110,7 +169,8 @@ class OutputParser:
     @staticmethod
     def extract_shell_commands(messages: List[Dict]) -> List[Dict[str, Any]]:
         """Extract shell commands from tool calls."""
-        shell_commands = []
+        shell_commands: List[Dict[str, Any]] = []
+        append = shell_commands.append
 
         for msg in messages:
             if msg.get("type") != "assistant":
@@ -125,8 +185,8 @@ class OutputParser:
                 tool_input = block.get("input", {})
 
                 # Check for shell/bash tools
-                if tool_name in ["bash", "shell", "Bash"]:
-                    shell_commands.append(
+                if tool_name in _SHELL_TOOLS:
+                    append(
                         {
                             "operation": tool_name,
                             "command": tool_input.get("command"),
@@ -141,7 +201,8 @@ class OutputParser:
     @staticmethod
     def extract_response_text(messages: List[Dict]) -> str:
         """Extract all text content from assistant messages."""
-        text_parts = []
+        buffer = io.StringIO()
+        separator = ""
 
         for msg in messages:
             if msg.get("type") != "assistant":
@@ -150,9 +211,11 @@ class OutputParser:
             message = msg.get("message", {})
             for block in message.get("content", []):
                 if block.get("type") == "text":
-                    text_parts.append(block.get("text", ""))
+                    buffer.write(separator)
+                    buffer.write(block.get("text", ""))
+                    separator = "\n"
 
-        return "\n".join(text_parts)
+        return buffer.getvalue()
 
     @staticmethod
     def extract_tool_results(messages: List[Dict]) -> List[Dict[str, Any]]:
@@ -180,19 +243,26 @@ class OutputParser:
         errors = []
 
         for msg in messages:
+            msg_type = msg.get("type")
+
             # Check for error messages
-            if msg.get("is_error") or msg.get("type") == "error":
+            if msg_type == "error" or msg.get("is_error"):
                 errors.append(
                     {
                         "type": msg.get("type", "unknown"),
                         "subtype": msg.get("subtype"),
-                        "message": msg.get("message", str(msg)),
+                        # Only stringify the whole message when it has no text
+                        "message": msg["message"] if "message" in msg else str(msg),
                         "timestamp": msg.get("timestamp"),
                     }
                 )
 
+                # An error message can't also be a tool result
+                if msg_type == "error":
+                    continue
+
             # Check for tool result errors
-            if msg.get("type") == "tool_result":
+            if msg_type == "tool_result":
                 result = msg.get("result", {})
                 if result.get("is_error"):
                     errors.append(
@@ -210,49 +280,66 @@ class OutputParser:
     @staticmethod
     def summarize_session(messages: List[Dict]) -> Dict[str, Any]:
         """Create a summary of the session."""
-        summary = {
-            "total_messages": len(messages),
-            "assistant_messages": 0,
-            "user_messages": 0,
-            "tool_calls": 0,
-            "tool_results": 0,
-            "errors": 0,
-            "code_blocks": 0,
-            "file_operations": 0,
-            "shell_commands": 0,
-        }
+        if not messages:
+            return dict(_EMPTY_SUMMARY)
 
-        full_text = ""
+        # Count in locals; the summary dict is built once at the end
+        assistant_messages = user_messages = tool_calls = tool_results = 0
+        errors = file_operations = shell_commands = 0
+
+        text_parts: List[str] = []
 
         for msg in messages:
             msg_type = msg.get("type")
 
             if msg_type == "assistant":
-                summary["assistant_messages"] += 1
+                assistant_messages += 1
 
                 # Extract text for analysis
                 message = msg.get("message", {})
                 for block in message.get("content", []):
-                    if block.get("type") == "text":
-                        full_text += block.get("text", "") + "\n"
-                    elif block.get("type") == "tool_use":
-                        summary["tool_calls"] += 1
+                    block_type = block.get("type")
+                    if block_type == "text":
+                        text_parts.append(block.get("text", ""))
+                    elif block_type == "tool_use":
+                        tool_calls += 1
+
+                        # Count file and shell tools here rather than
+                        # rescanning messages with the extractors
+                        tool_name = block.get("name", "")
+                        if tool_name in _FILE_TOOLS:
+                            file_operations += 1
+                        elif tool_name in _SHELL_TOOLS:
+                            shell_commands += 1
 
             elif msg_type == "user":
-                summary["user_messages"] += 1
+                user_messages += 1
 
             elif msg_type == "tool_result":
-                summary["tool_results"] += 1
+                tool_results += 1
 
             elif msg.get("is_error") or msg_type == "error":
-                summary["errors"] += 1
+                errors += 1
 
-        # Analyze extracted content
-        summary["code_blocks"] = len(OutputParser.extract_code_blocks(full_text))
-        summary["file_operations"] = len(OutputParser.extract_file_operations(messages))
-        summary["shell_commands"] = len(OutputParser.extract_shell_commands(messages))
+        # Skip extraction entirely for sessions without any code fences
+        full_text = "\n".join(text_parts)
+        code_blocks = (
+            len(OutputParser.extract_code_blocks(full_text))
+            if "```" in full_text
+            else 0
+        )
 
-        return summary
+        return {
+            "total_messages": len(messages),
+            "assistant_messages": assistant_messages,
+            "user_messages": user_messages,
+            "tool_calls": tool_calls,
+            "tool_results": tool_results,
+            "errors": errors,
+            "code_blocks": code_blocks,
+            "file_operations": file_operations,
+            "shell_commands": shell_commands,
+        }
 
 
 class ResponseFormatter:
@@ -271,8 +358,9 @@ class ResponseFormatter:
         parts = self._split_preserving_code_blocks(content)
 
         messages = []
+        max_length = self.max_message_length
         for part in parts:
-            if len(part) <= self.max_message_length:
+            if len(part) <= max_length:
                 messages.append(part)
             else:
                 # Split long parts
@@ -287,52 +375,46 @@ class ResponseFormatter:
     def _split_preserving_code_blocks(self, text: str) -> List[str]:
         """Split text while preserving code blocks."""
         parts = []
-        current_part = ""
+        # Read the limit once; it's checked for every line
+        max_length = self.max_message_length
+        # Buffer lines and track the running length instead of growing a string
+        current_lines: List[str] = []
+        current_length = 0
+        current_has_text = False
         in_code_block = False
 
         lines = text.split("\n")
 
         for line in lines:
+            stripped = line.strip()
+
             # Check for code block markers
-            if line.strip().startswith("```"):
+            if stripped.startswith("```"):
                 in_code_block = not in_code_block
 
-            line_with_newline = line + "\n"
+            line_length = len(line) + 1  # Including the newline
 
             # If adding this line would exceed limit and we're not in a code block
             if (
-                len(current_part + line_with_newline) > self.max_message_length
+                current_length + line_length > max_length
                 and not in_code_block
-                and current_part.strip()
+                and current_has_text
             ):
-                parts.append(current_part.rstrip())
-                current_part = line_with_newline
+                parts.append("\n".join(current_lines).rstrip())
+                current_lines = [line]
+                current_length = line_length
+                current_has_text = bool(stripped)
             else:
-                current_part += line_with_newline
+                current_lines.append(line)
+                current_length += line_length
+                current_has_text = current_has_text or bool(stripped)
 
-        if current_part.strip():
-            parts.append(current_part.rstrip())
+        if current_has_text:
+            parts.append("\n".join(current_lines).rstrip())
 
         return parts
 
     def _split_long_text(self, text: str) -> List[str]:
         """Split text that's too long for a single message."""
-        parts = []
-        current = ""
-
-        for char in text:
-            if len(current + char) > self.max_message_length:
-                if current:
-                    parts.append(current)
-                    current = char
-                else:
-                    # Single character somehow exceeds limit
-                    parts.append(char)
-                    current = ""
-            else:
-                current += char
-
-        if current:
-            parts.append(current)
-
-        return parts
+        step = self.max_message_length
+        return [text[i : i + step] for i in range(0, len(text), step)]
@@ -8,11 +8,22 @@ Features:
 """
 
 import asyncio
+import io
 import os
+import time
 import uuid
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+)
 
 import structlog
 from claude_code_sdk import (
@@ -40,7 +51,7 @@ from .exceptions import (
     ClaudeTimeoutError,
 )
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 def find_claude_cli(claude_cli_path: Optional[str] = None) -> Optional[str]:
@@ -104,7 +115,7 @@ def update_path_for_claude(claude_cli_path: Optional[str] = None) -> bool:
     return False
 
 
-@dataclass
+@dataclass(slots=True)
 class ClaudeResponse:
     """Response from Claude Code SDK."""
 
@@ -118,7 +129,7 @@ class ClaudeResponse:
     tools_used: List[Dict[str, Any]] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamUpdate:
     """Streaming update from Claude SDK."""
 
@@ -160,7 +171,7 @@ class ClaudeSDKManager:
         stream_callback: Optional[Callable[[StreamUpdate], None]] = None,
     ) -> ClaudeResponse:
         """Execute Claude Code command via SDK."""
-        start_time = asyncio.get_event_loop().time()
+        start_time = time.monotonic()
 
         logger.info(
             "Starting Claude SDK command",
@@ -179,8 +190,6 @@ class ClaudeSDKManager:
 
             # Collect messages
             messages = []
-            cost = 0.0
-            tools_used = []
 
             # Execute with streaming and timeout
             await asyncio.wait_for(
@@ -190,17 +199,24 @@ class ClaudeSDKManager:
                 timeout=self.config.claude_timeout_seconds,
             )
 
+            # Find the result message and count turns in a single pass
+            num_turns = 0
+            result_message = None
+            for message in messages:
+                if isinstance(message, (UserMessage, AssistantMessage)):
+                    num_turns += 1
+                elif result_message is None and isinstance(message, ResultMessage):
+                    result_message = message
+
             # Extract cost and tools from result message
             cost = 0.0
             tools_used = []
-            for message in messages:
-                if isinstance(message, ResultMessage):
-                    cost = getattr(message, "total_cost_usd", 0.0) or 0.0
-                    tools_used = self._extract_tools_from_messages(messages)
-                    break
+            if result_message is not None:
+                cost = getattr(result_message, "total_cost_usd", 0.0) or 0.0
+                tools_used = self._extract_tools_from_messages(messages)
 
             # Calculate duration
-            duration_ms = int((asyncio.get_event_loop().time() - start_time) * 1000)
+            duration_ms = int((time.monotonic() - start_time) * 1000)
 
             # Get or create session ID
             final_session_id = session_id or str(uuid.uuid4())
@@ -213,13 +229,7 @@ class ClaudeSDKManager:
                 session_id=final_session_id,
                 cost=cost,
                 duration_ms=duration_ms,
-                num_turns=len(
-                    [
-                        m
-                        for m in messages
-                        if isinstance(m, (UserMessage, AssistantMessage))
-                    ]
-                ),
+                num_turns=num_turns,
                 tools_used=tools_used,
             )
 
@@ -337,69 +347,107 @@ class ClaudeSDKManager:
         self, message: Message, stream_callback: Callable[[StreamUpdate], None]
     ) -> None:
         """Handle streaming message from claude-code-sdk."""
-        try:
-            if isinstance(message, AssistantMessage):
-                # Extract content from assistant message
-                content = getattr(message, "content", [])
-                if content and isinstance(content, list):
-                    # Extract text from TextBlock objects
-                    text_parts = []
-                    for block in content:
-                        if hasattr(block, "text"):
-                            text_parts.append(block.text)
-                    if text_parts:
-                        update = StreamUpdate(
-                            type="assistant",
-                            content="\n".join(text_parts),
-                        )
-                        await stream_callback(update)
-                elif content:
-                    # Fallback for non-list content
-                    update = StreamUpdate(
-                        type="assistant",
-                        content=str(content),
-                    )
-                    await stream_callback(update)
-
-                # Check for tool calls (if available in the message structure)
-                # Note: This depends on the actual claude-code-sdk message structure
-
-            elif isinstance(message, UserMessage):
-                content = getattr(message, "content", "")
-                if content:
-                    update = StreamUpdate(
-                        type="user",
-                        content=content,
-                    )
-                    await stream_callback(update)
+        # The SDK yields its concrete message classes, so an exact type lookup
+        # replaces a chain of isinstance checks; subclasses fall back to the
+        # handler of their nearest registered base
+        handler = self._STREAM_HANDLERS.get(type(message))
+        if handler is None:
+            handler = next(
+                (
+                    self._STREAM_HANDLERS[base]
+                    for base in type(message).__mro__[1:]
+                    if base in self._STREAM_HANDLERS
+                ),
+                None,
+            )
+            if handler is None:
+                return
 
+        try:
+            await handler(self, message, stream_callback)
         except Exception as e:
             logger.warning("Stream callback failed", error=str(e))
 
+    async def _stream_assistant_message(
+        self, message: AssistantMessage, stream_callback: Callable
+    ) -> None:
+        """Send assistant text to the stream callback."""
+        content = message.content
+        if isinstance(content, list):
+            # Extract text from TextBlock objects
+            text_parts: List[str] = []
+            append = text_parts.append
+            for block in content:
+                text = getattr(block, "text", None)
+                if text is not None:
+                    append(text)
+            if text_parts:
+                update = StreamUpdate(
+                    type="assistant",
+                    content="\n".join(text_parts),
+                )
+                await stream_callback(update)
+        elif content:
+            # Fallback for non-list content
+            update = StreamUpdate(
+                type="assistant",
+                content=str(content),
+            )
+            await stream_callback(update)
+
+        # Check for tool calls (if available in the message structure)
+        # Note: This depends on the actual claude-code-sdk message structure
+
+    async def _stream_user_message(
+        self, message: UserMessage, stream_callback: Callable
+    ) -> None:
+        """Send user content to the stream callback."""
+        content = getattr(message, "content", "")
+        if content:
+            update = StreamUpdate(
+                type="user",
+                content=content,
+            )
+            await stream_callback(update)
+
+    _STREAM_HANDLERS: ClassVar[Dict[type, Callable[..., Awaitable[None]]]] = {
+        AssistantMessage: _stream_assistant_message,
+        UserMessage: _stream_user_message,
+    }
+
     def _extract_content_from_messages(self, messages: List[Message]) -> str:
         """Extract content from message list."""
-        content_parts = []
+        # Write straight into one buffer rather than keeping every part alive
+        # until a final join
+        buffer = io.StringIO()
+        write = buffer.write
+        separator = ""
 
         for message in messages:
             if isinstance(message, AssistantMessage):
-                content = getattr(message, "content", [])
-                if content and isinstance(content, list):
+                content = message.content
+                if isinstance(content, list):
                     # Extract text from TextBlock objects
                     for block in content:
-                        if hasattr(block, "text"):
-                            content_parts.append(block.text)
+                        text = getattr(block, "text", None)
+                        if text is not None:
+                            write(separator)
+                            write(text)
+                            separator = "\n"
                 elif content:
                     # Fallback for non-list content
-                    content_parts.append(str(content))
+                    write(separator)
+                    write(str(content))
+                    separator = "\n"
 
-        return "\n".join(content_parts)
+        return buffer.getvalue()
 
     def _extract_tools_from_messages(
         self, messages: List[Message]
     ) -> List[Dict[str, Any]]:
         """Extract tools used from message list."""
         tools_used = []
-        current_time = asyncio.get_event_loop().time()
+        current_time = time.monotonic()
 
         for message in messages:
             if isinstance(message, AssistantMessage):
@@ -419,15 +467,13 @@ class ClaudeSDKManager:
 
     def _update_session(self, session_id: str, messages: List[Message]) -> None:
         """Update session data."""
-        if session_id not in self.active_sessions:
-            self.active_sessions[session_id] = {
-                "messages": [],
-                "created_at": asyncio.get_event_loop().time(),
-            }
-
-        session_data = self.active_sessions[session_id]
+        # Same monotonic clock the event loop uses, read once
+        now = time.monotonic()
+        session_data = self.active_sessions.setdefault(
+            session_id, {"messages": [], "created_at": now}
+        )
         session_data["messages"] = messages
-        session_data["last_used"] = asyncio.get_event_loop().time()
+        session_data["last_used"] = now
 
     async def kill_all_processes(self) -> None:
         """Kill all active processes (no-op for SDK)."""
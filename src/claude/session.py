@@ -10,8 +10,9 @@ Features:
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from operator import attrgetter
 from pathlib import Path
-from typing import TYPE_CHECKING, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Union
 
 import structlog
 
@@ -24,10 +25,10 @@ if TYPE_CHECKING:
 # Union type for both CLI and SDK responses
 ClaudeResponse = Union["CLIClaudeResponse", "SDKClaudeResponse"]
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class ClaudeSession:
     """Claude Code session state."""
 
@@ -39,13 +40,14 @@ class ClaudeSession:
     total_cost: float = 0.0
     total_turns: int = 0
     message_count: int = 0
-    tools_used: List[str] = field(default_factory=list)
+    tools_used: Set[str] = field(default_factory=set)
     is_new_session: bool = False  # True if session hasn't been sent to Claude Code yet
 
-    def is_expired(self, timeout_hours: int) -> bool:
-        """Check if session has expired."""
-        age = datetime.utcnow() - self.last_used
-        return age > timedelta(hours=timeout_hours)
+    def is_expired(self, timeout_hours: int, now: Optional[datetime] = None) -> bool:
+        """Check if session has expired, optionally against a shared ``now``."""
+        if now is None:
+            now = datetime.utcnow()
+        return now - self.last_used > timedelta(hours=timeout_hours)
 
     def update_usage(self, response: ClaudeResponse) -> None:
         """Update session with usage from response."""
@@ -56,10 +58,11 @@ class ClaudeSession:
 
         # Track unique tools
         if response.tools_used:
-            for tool in response.tools_used:
-                tool_name = tool.get("name")
-                if tool_name and tool_name not in self.tools_used:
-                    self.tools_used.append(tool_name)
+            self.tools_used.update(
+                tool_name
+                for tool in response.tools_used
+                if (tool_name := tool.get("name"))
+            )
 
     def to_dict(self) -> Dict:
         """Convert session to dictionary for storage."""
@@ -72,7 +75,7 @@ class ClaudeSession:
             "total_cost": self.total_cost,
             "total_turns": self.total_turns,
             "message_count": self.message_count,
-            "tools_used": self.tools_used,
+            "tools_used": sorted(self.tools_used),
         }
 
     @classmethod
@@ -87,7 +90,7 @@ class ClaudeSession:
             total_cost=data.get("total_cost", 0.0),
             total_turns=data.get("total_turns", 0),
             message_count=data.get("message_count", 0),
-            tools_used=data.get("tools_used", []),
+            tools_used=set(data.get("tools_used", ())),
         )
 
 
@@ -121,10 +124,18 @@ class InMemorySessionStorage(SessionStorage):
     def __init__(self):
         """Initialize in-memory storage."""
         self.sessions: Dict[str, ClaudeSession] = {}
+        # Sessions per user, in save order, so user lookups skip other users
+        self._user_sessions: Dict[int, Dict[str, ClaudeSession]] = {}
 
     async def save_session(self, session: ClaudeSession) -> None:
         """Save session to memory."""
+        previous = self.sessions.get(session.session_id)
+        if previous is not None and previous.user_id != session.user_id:
+            self._unindex(previous)
+
         self.sessions[session.session_id] = session
+        user_sessions = self._user_sessions.setdefault(session.user_id, {})
+        user_sessions[session.session_id] = session
         logger.debug("Session saved to memory", session_id=session.session_id)
 
     async def load_session(self, session_id: str) -> Optional[ClaudeSession]:
@@ -136,15 +147,22 @@ class InMemorySessionStorage(SessionStorage):
 
     async def delete_session(self, session_id: str) -> None:
         """Delete session from memory."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self._unindex(session)
             logger.debug("Session deleted from memory", session_id=session_id)
 
     async def get_user_sessions(self, user_id: int) -> List[ClaudeSession]:
         """Get all sessions for a user."""
-        return [
-            session for session in self.sessions.values() if session.user_id == user_id
-        ]
+        return list(self._user_sessions.get(user_id, {}).values())
+
+    def _unindex(self, session: ClaudeSession) -> None:
+        """Remove a session from the per-user index."""
+        user_sessions = self._user_sessions.get(session.user_id)
+        if user_sessions is not None:
+            user_sessions.pop(session.session_id, None)
+            if not user_sessions:
+                del self._user_sessions[session.user_id]
 
     async def get_all_sessions(self) -> List[ClaudeSession]:
         """Get all sessions."""
@@ -174,26 +192,29 @@ class SessionManager:
             session_id=session_id,
         )
 
-        # Check for existing session
-        if session_id and session_id in self.active_sessions:
-            session = self.active_sessions[session_id]
-            if not session.is_expired(self.config.session_timeout_hours):
-                logger.debug("Using active session", session_id=session_id)
-                return session
-
-        # Try to load from storage
         if session_id:
-            session = await self.storage.load_session(session_id)
-            if session and not session.is_expired(self.config.session_timeout_hours):
-                self.active_sessions[session_id] = session
-                logger.info("Loaded session from storage", session_id=session_id)
-                return session
+            # Check for existing session
+            session = self.active_sessions.get(session_id)
+            if session is not None:
+                if not session.is_expired(self.config.session_timeout_hours):
+                    logger.debug("Using active session", session_id=session_id)
+                    return session
+                # Saves go through active_sessions, so storage holds no newer copy
+            else:
+                # Try to load from storage
+                session = await self.storage.load_session(session_id)
+                if session and not session.is_expired(
+                    self.config.session_timeout_hours
+                ):
+                    self.active_sessions[session_id] = session
+                    logger.info("Loaded session from storage", session_id=session_id)
+                    return session
 
         # Check user session limit
         user_sessions = await self._get_user_sessions(user_id)
         if len(user_sessions) >= self.config.max_sessions_per_user:
             # Remove oldest session
-            oldest = min(user_sessions, key=lambda s: s.last_used)
+            oldest = min(user_sessions, key=attrgetter("last_used"))
             await self.remove_session(oldest.session_id)
             logger.info(
                 "Removed oldest session due to limit",
@@ -229,8 +250,8 @@ class SessionManager:
 
     async def update_session(self, session_id: str, response: ClaudeResponse) -> None:
         """Update session with response data."""
-        if session_id in self.active_sessions:
-            session = self.active_sessions[session_id]
+        session = self.active_sessions.get(session_id)
+        if session is not None:
             old_session_id = session.session_id
 
             # For new sessions, update to Claude's actual session ID
@@ -273,9 +294,7 @@ class SessionManager:
 
     async def remove_session(self, session_id: str) -> None:
         """Remove session."""
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-
+        self.active_sessions.pop(session_id, None)
         await self.storage.delete_session(session_id)
         logger.info("Session removed", session_id=session_id)
 
@@ -284,10 +303,12 @@ class SessionManager:
         logger.info("Starting session cleanup")
 
         all_sessions = await self.storage.get_all_sessions()
+        timeout_hours = self.config.session_timeout_hours
+        now = datetime.utcnow()
         expired_count = 0
 
         for session in all_sessions:
-            if session.is_expired(self.config.session_timeout_hours):
+            if session.is_expired(timeout_hours, now):
                 await self.remove_session(session.session_id)
                 expired_count += 1
 
@@ -314,7 +335,7 @@ class SessionManager:
                 "cost": session.total_cost,
                 "turns": session.total_turns,
                 "messages": session.message_count,
-                "tools_used": session.tools_used,
+                "tools_used": sorted(session.tools_used),
                 "expired": session.is_expired(self.config.session_timeout_hours),
             }
 
@@ -326,9 +347,9 @@ class SessionManager:
 
         total_cost = sum(s.total_cost for s in sessions)
         total_messages = sum(s.message_count for s in sessions)
-        active_sessions = [
-            s for s in sessions if not s.is_expired(self.config.session_timeout_hours)
-        ]
+        timeout_hours = self.config.session_timeout_hours
+        now = datetime.utcnow()
+        active_sessions = [s for s in sessions if not s.is_expired(timeout_hours, now)]
 
         return {
             "user_id": user_id,
@@ -2,12 +2,13 @@
 
 from .environments import DevelopmentConfig, ProductionConfig, TestingConfig
 from .features import FeatureFlags
-from .loader import create_test_config, load_config
+from .loader import create_test_config, invalidate_config_cache, load_config
 from .settings import Settings
 
 __all__ = [
     "Settings",
     "load_config",
+    "invalidate_config_cache",
     "create_test_config",
     "DevelopmentConfig",
     "ProductionConfig",
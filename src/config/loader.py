@@ -1,8 +1,9 @@
 """Configuration loading with environment detection."""
 
 import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Hashable, Optional, Tuple
 
 import structlog
 from dotenv import load_dotenv
@@ -12,7 +13,11 @@ from src.exceptions import ConfigurationError, InvalidConfigError
 from .environments import DevelopmentConfig, ProductionConfig, TestingConfig
 from .settings import Settings
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
+
+# Loaded settings keyed by environment, .env file stamps and process environment
+_CONFIG_CACHE_SIZE = 4
+_config_cache: "OrderedDict[Tuple[Hashable, ...], Settings]" = OrderedDict()
 
 
 def load_config(
@@ -40,6 +45,15 @@ def load_config(
 
     # Determine environment
     env = env or os.getenv("ENVIRONMENT", "development")
+
+    cache_key = _config_cache_key(env, env_file)
+    cached = _config_cache.get(cache_key)
+    if cached is not None:
+        _config_cache.move_to_end(cache_key)
+        logger.debug("Using cached configuration", environment=env)
+        # Deep copies so callers mutating list fields can't alter the cache
+        return cached.model_copy(deep=True)
+
     logger.info("Loading configuration", environment=env)
 
     try:
@@ -69,13 +83,47 @@ def load_config(
             features_enabled=_get_enabled_features_summary(settings),
         )
 
-        return settings
+        _config_cache[cache_key] = settings
+        if len(_config_cache) > _CONFIG_CACHE_SIZE:
+            _config_cache.popitem(last=False)
+
+        return settings.model_copy(deep=True)
 
     except Exception as e:
         logger.error("Failed to load configuration", error=str(e), environment=env)
         raise ConfigurationError(f"Configuration loading failed: {e}") from e
 
 
+def invalidate_config_cache() -> None:
+    """Drop cached settings so the next load_config call re-reads everything."""
+    _config_cache.clear()
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for a file, or None if it cannot be read."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _config_cache_key(env: Optional[str], env_file: Path) -> Tuple[Hashable, ...]:
+    """Build the cache key for a load_config call.
+
+    Settings reads both the process environment and the default .env file, so
+    both are part of the key alongside the explicitly loaded file.
+    """
+    default_env_file = Path(".env")
+    return (
+        env,
+        str(env_file),
+        _file_stamp(env_file),
+        _file_stamp(default_env_file) if env_file != default_env_file else None,
+        frozenset(os.environ.items()),
+    )
+
+
 def _apply_environment_overrides(settings: Settings, env: Optional[str]) -> Settings:
     """Apply environment-specific configuration overrides."""
     overrides = {}
@@ -8,8 +8,9 @@ Features:
 - Environment-specific settings
 """
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 
 from pydantic import Field, SecretStr, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -17,9 +18,11 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from src.utils.constants import (
     DEFAULT_CLAUDE_MAX_COST_PER_USER,
     DEFAULT_CLAUDE_MAX_TURNS,
+    DEFAULT_CLAUDE_STDOUT_BUFFER_LIMIT,
     DEFAULT_CLAUDE_TIMEOUT_SECONDS,
     DEFAULT_DATABASE_URL,
     DEFAULT_MAX_SESSIONS_PER_USER,
+    DEFAULT_MAX_VIOLATIONS_RETAINED,
     DEFAULT_RATE_LIMIT_BURST,
     DEFAULT_RATE_LIMIT_REQUESTS,
     DEFAULT_RATE_LIMIT_WINDOW,
@@ -27,6 +30,13 @@ from src.utils.constants import (
 )
 
 
+@lru_cache(maxsize=16)
+def _parse_user_ids(raw: str) -> Tuple[int, ...]:
+    """Parse a comma-separated user ID string, memoized per raw value."""
+    # int() ignores surrounding whitespace, so only empty entries need skipping
+    return tuple(int(uid) for uid in raw.split(",") if uid.strip())
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
@@ -71,6 +81,10 @@ class Settings(BaseSettings):
     claude_max_cost_per_user: float = Field(
         DEFAULT_CLAUDE_MAX_COST_PER_USER, description="Max cost per user"
     )
+    claude_stdout_buffer_limit: int = Field(
+        DEFAULT_CLAUDE_STDOUT_BUFFER_LIMIT,
+        description="Bytes buffered from the Claude CLI before reading pauses",
+    )
     use_sdk: bool = Field(True, description="Use Python SDK instead of CLI subprocess")
     claude_allowed_tools: Optional[List[str]] = Field(
         default=[
@@ -138,6 +152,10 @@ class Settings(BaseSettings):
     log_level: str = Field("INFO", description="Logging level")
     enable_telemetry: bool = Field(False, description="Enable anonymous telemetry")
     sentry_dsn: Optional[str] = Field(None, description="Sentry DSN for error tracking")
+    max_violations_retained: int = Field(
+        DEFAULT_MAX_VIOLATIONS_RETAINED,
+        description="Maximum recent security violations kept in memory",
+    )
 
     # Development
     debug: bool = Field(False, description="Enable debug mode")
@@ -157,7 +175,8 @@ class Settings(BaseSettings):
     def parse_allowed_users(cls, v: Any) -> Optional[List[int]]:
         """Parse comma-separated user IDs."""
         if isinstance(v, str):
-            return [int(uid.strip()) for uid in v.split(",") if uid.strip()]
+            # Fresh list per instance; the cached tuple is shared
+            return list(_parse_user_ids(v))
         # handle single user id
         elif isinstance(v, int):
             return [v]
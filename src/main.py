@@ -2,13 +2,17 @@
 
 import argparse
 import asyncio
+import json
 import logging
 import signal
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Awaitable, List, Tuple
 
+import orjson
 import structlog
+from structlog.types import Processor
 
 from src import __version__
 from src.bot.core import ClaudeCodeBot
@@ -23,17 +27,46 @@ from src.config.features import FeatureFlags
 from src.config.loader import load_config
 from src.config.settings import Settings
 from src.exceptions import ConfigurationError
-from src.security.audit import AuditLogger, InMemoryAuditStorage
+from src.security.audit import AuditLogger
 from src.security.auth import (
     AuthenticationManager,
-    InMemoryTokenStorage,
     TokenAuthProvider,
     WhitelistAuthProvider,
 )
 from src.security.rate_limiter import RateLimiter
 from src.security.validators import SecurityValidator
 from src.storage.facade import Storage
+from src.storage.security_storage import SQLiteAuditStorage, SQLiteTokenStorage
 from src.storage.session_storage import SQLiteSessionStorage
+from src.utils.constants import DEFAULT_SHUTDOWN_STEP_TIMEOUT_SECONDS
+
+logger = structlog.get_logger(__name__)
+
+
+def _orjson_dumps(obj: Any, **kwargs: Any) -> str:
+    """Serialize a log event with orjson for the stdlib logger factory."""
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, **kwargs).decode()
+    except TypeError:
+        # orjson rejects integers wider than 64 bits; a log field must never
+        # make the logging call itself fail
+        return json.dumps(obj, default=repr)
+
+
+_BASE_PROCESSORS: Tuple[Processor, ...] = (
+    structlog.stdlib.filter_by_level,
+    structlog.stdlib.add_logger_name,
+    structlog.stdlib.add_log_level,
+)
+
+# Production logs are machine-read: epoch seconds are far cheaper to produce
+# than an ISO string and orjson writes the float natively
+_JSON_PROCESSORS: Tuple[Processor, ...] = (
+    *_BASE_PROCESSORS,
+    structlog.processors.TimeStamper(fmt=None, utc=True),
+    structlog.processors.format_exc_info,
+    structlog.processors.JSONRenderer(serializer=_orjson_dumps),
+)
 
 
 def setup_logging(debug: bool = False) -> None:
@@ -47,23 +80,20 @@ def setup_logging(debug: bool = False) -> None:
         stream=sys.stdout,
     )
 
-    # Configure structlog
-    structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
+    processors: List[Processor]
+    if debug:
+        processors = [
+            *_BASE_PROCESSORS,
             structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            (
-                structlog.processors.JSONRenderer()
-                if not debug
-                else structlog.dev.ConsoleRenderer()
-            ),
-        ],
+            structlog.dev.ConsoleRenderer(),
+        ]
+    else:
+        processors = list(_JSON_PROCESSORS)
+
+    # Configure structlog
+    structlog.configure(
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
@@ -89,14 +119,21 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-async def create_application(config: Settings) -> Dict[str, Any]:
+@dataclass(slots=True, frozen=True)
+class AppContext:
+    """Top-level application components created at startup."""
+
+    bot: ClaudeCodeBot
+    claude_integration: ClaudeIntegration
+    storage: Storage
+    config: Settings
+
+
+async def create_application(config: Settings) -> AppContext:
     """Create and configure the application components."""
-    logger = structlog.get_logger()
     logger.info("Creating application components")
 
-    # Initialize storage system
     storage = Storage(config.database_url)
-    await storage.initialize()
 
     # Create security components
     providers = []
@@ -107,7 +144,7 @@ async def create_application(config: Settings) -> Dict[str, Any]:
 
     # Add token provider if enabled
     if config.enable_token_auth:
-        token_storage = InMemoryTokenStorage()  # TODO: Use database storage
+        token_storage = SQLiteTokenStorage(storage.db_manager)
         providers.append(TokenAuthProvider(config.auth_token_secret, token_storage))
 
     # Fall back to allowing all users in development mode
@@ -119,12 +156,15 @@ async def create_application(config: Settings) -> Dict[str, Any]:
     elif not providers:
         raise ConfigurationError("No authentication providers configured")
 
+    # Initialize storage once the auth configuration is known to be valid
+    await storage.initialize()
+
     auth_manager = AuthenticationManager(providers)
     security_validator = SecurityValidator(config.approved_directory)
     rate_limiter = RateLimiter(config)
 
     # Create audit storage and logger
-    audit_storage = InMemoryAuditStorage()  # TODO: Use database storage in production
+    audit_storage = SQLiteAuditStorage(storage.db_manager)
     audit_logger = AuditLogger(audit_storage)
 
     # Create Claude integration components with persistent storage
@@ -165,30 +205,49 @@ async def create_application(config: Settings) -> Dict[str, Any]:
 
     logger.info("Application components created successfully")
 
-    return {
-        "bot": bot,
-        "claude_integration": claude_integration,
-        "storage": storage,
-        "config": config,
-    }
+    return AppContext(
+        bot=bot,
+        claude_integration=claude_integration,
+        storage=storage,
+        config=config,
+    )
 
 
-async def run_application(app: Dict[str, Any]) -> None:
+async def _shutdown_step(name: str, step: Awaitable[None]) -> None:
+    """Run one shutdown step with a timeout, logging rather than raising."""
+    try:
+        await asyncio.wait_for(step, timeout=DEFAULT_SHUTDOWN_STEP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error(
+            "Shutdown step timed out",
+            step=name,
+            timeout=DEFAULT_SHUTDOWN_STEP_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        logger.error("Error during shutdown", step=name, error=str(e))
+
+
+async def run_application(app: AppContext) -> None:
     """Run the application with graceful shutdown handling."""
-    logger = structlog.get_logger()
-    bot: ClaudeCodeBot = app["bot"]
-    claude_integration: ClaudeIntegration = app["claude_integration"]
-    storage: Storage = app["storage"]
+    bot = app.bot
+    claude_integration = app.claude_integration
+    storage = app.storage
 
     # Set up signal handlers for graceful shutdown
     shutdown_event = asyncio.Event()
 
-    def signal_handler(signum, frame):
+    def signal_handler(signum: int) -> None:
         logger.info("Shutdown signal received", signal=signum)
         shutdown_event.set()
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    # Register on the running loop so the event is set from within the loop
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, signal_handler, signum)
+        except NotImplementedError:
+            # Event loops without signal support (e.g. on Windows)
+            signal.signal(signum, lambda signum, frame: signal_handler(signum))
 
     try:
         # Start the bot
@@ -218,12 +277,12 @@ async def run_application(app: Dict[str, Any]) -> None:
         # Graceful shutdown
         logger.info("Shutting down application")
 
-        try:
-            await bot.stop()
-            await claude_integration.shutdown()
-            await storage.close()
-        except Exception as e:
-            logger.error("Error during shutdown", error=str(e))
+        # Steps stay sequential: the Claude shutdown cleans up sessions in
+        # storage, so storage must be closed last. Each step is bounded so a
+        # hung one can't block the rest
+        await _shutdown_step("bot", bot.stop())
+        await _shutdown_step("claude", claude_integration.shutdown())
+        await _shutdown_step("storage", storage.close())
 
         logger.info("Application shutdown complete")
 
@@ -233,13 +292,10 @@ async def main() -> None:
     args = parse_args()
     setup_logging(debug=args.debug)
 
-    logger = structlog.get_logger()
     logger.info("Starting Claude Code Telegram Bot", version=__version__)
 
     try:
         # Load configuration
-        from src.config import FeatureFlags, load_config
-
         config = load_config(config_file=args.config_file)
         features = FeatureFlags(config)
 
@@ -265,7 +321,14 @@ async def main() -> None:
 def run() -> None:
     """Synchronous entry point for setuptools."""
     try:
-        asyncio.run(main())
+        # Eager tasks start running inside create_task instead of waiting a
+        # loop iteration; the factory is only available on Python 3.12+
+        if sys.version_info >= (3, 12):
+            with asyncio.Runner() as runner:
+                runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+                runner.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\nShutdown requested by user")
         sys.exit(0)
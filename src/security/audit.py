@@ -16,7 +16,7 @@ import structlog
 
 # from src.exceptions import SecurityError  # Future use
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 @dataclass
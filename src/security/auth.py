@@ -20,7 +20,7 @@ from src.exceptions import SecurityError
 
 # from src.exceptions import AuthenticationError  # Future use
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 @dataclass
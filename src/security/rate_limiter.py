@@ -17,7 +17,7 @@ import structlog
 
 from ..config.settings import Settings
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 @dataclass
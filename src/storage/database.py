@@ -8,14 +8,16 @@ Features:
 """
 
 import asyncio
+import uuid
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import AsyncIterator, List, Tuple
+from typing import Any, AsyncIterator, List, Optional, Tuple, Union, cast
 
 import aiosqlite
 import structlog
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 # Initial schema migration
 INITIAL_SCHEMA = """
@@ -121,16 +123,59 @@ CREATE INDEX idx_audit_log_timestamp ON audit_log(timestamp);
 CREATE INDEX idx_cost_tracking_user_date ON cost_tracking(user_id, date);
 """
 
+# Applied once when each physical connection is opened, in a single script.
+# Files run in WAL mode (see _run_migrations), where synchronous=NORMAL skips
+# the per-commit fsync without risking corruption
+_CONNECTION_PRAGMAS = """
+PRAGMA foreign_keys = ON;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -16000;  -- KiB, per connection
+"""
+
+
+class _TransactionConnection:
+    """Connection handed out inside ``DatabaseManager.transaction()``.
+
+    Commits are deferred so the enclosing transaction commits once.
+    """
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    async def commit(self) -> None:
+        """Leave the commit to the enclosing transaction."""
+
 
 class DatabaseManager:
     """Manage database connections and initialization."""
 
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, pool_size: int = 5):
         """Initialize database manager."""
         self.database_path = self._parse_database_url(database_url)
+        self._connect_target: Union[str, Path] = self.database_path
+        self._connect_uri = False
+        if str(self.database_path) == ":memory:":
+            # Every plain ":memory:" connection gets its own empty database, so
+            # pooled connections share a named in-memory database instead
+            self._connect_target = (
+                f"file:memdb_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            )
+            self._connect_uri = True
         self._connection_pool = []
-        self._pool_size = 5
+        self._pool_size = pool_size
         self._pool_lock = asyncio.Lock()
+        # Connection pinned by transaction() for the current task context
+        self._transaction: ContextVar[Optional[aiosqlite.Connection]] = ContextVar(
+            f"db_transaction_{id(self)}", default=None
+        )
+        # Bumped by repositories on writes that cached aggregates depend on
+        self.write_version = 0
 
     def _parse_database_url(self, database_url: str) -> Path:
         """Parse database URL to path."""
@@ -148,21 +193,21 @@ class DatabaseManager:
         # Ensure directory exists
         self.database_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # Initialize connection pool first; an in-memory database only lives
+        # while a connection to it is open
+        await self._init_pool()
+
         # Run migrations
         await self._run_migrations()
 
-        # Initialize connection pool
-        await self._init_pool()
-
         logger.info("Database initialization complete")
 
     async def _run_migrations(self):
         """Run database migrations."""
-        async with aiosqlite.connect(self.database_path) as conn:
-            conn.row_factory = aiosqlite.Row
-
-            # Enable foreign keys
-            await conn.execute("PRAGMA foreign_keys = ON")
+        async with self.get_connection() as conn:
+            # WAL persists in the file; in-memory databases have no journal file
+            if not self._connect_uri:
+                await conn.execute("PRAGMA journal_mode = WAL")
 
             # Get current version
             current_version = await self._get_schema_version(conn)
@@ -230,6 +275,25 @@ class DatabaseManager:
                 GROUP BY u.user_id;
                 """,
             ),
+            (
+                3,
+                """
+                -- Indexes for the hot repository lookups
+                CREATE INDEX IF NOT EXISTS idx_users_allowed
+                    ON users(user_id) WHERE is_allowed = TRUE;
+
+                -- Serves the user filter and its last_used ordering, which
+                -- makes the user_id-only index redundant
+                CREATE INDEX IF NOT EXISTS idx_sessions_user_last_used
+                    ON sessions(user_id, last_used DESC);
+                DROP INDEX IF EXISTS idx_sessions_user_id;
+
+                CREATE INDEX IF NOT EXISTS idx_sessions_last_used
+                    ON sessions(last_used);
+                CREATE INDEX IF NOT EXISTS idx_tool_usage_session_timestamp
+                    ON tool_usage(session_id, timestamp);
+                """,
+            ),
         ]
 
     async def _init_pool(self):
@@ -238,21 +302,28 @@ class DatabaseManager:
 
         async with self._pool_lock:
             for _ in range(self._pool_size):
-                conn = await aiosqlite.connect(self.database_path)
-                conn.row_factory = aiosqlite.Row
-                await conn.execute("PRAGMA foreign_keys = ON")
-                self._connection_pool.append(conn)
+                self._connection_pool.append(await self._connect())
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """Open a connection with row access by name and the standard pragmas."""
+        conn = await aiosqlite.connect(self._connect_target, uri=self._connect_uri)
+        conn.row_factory = aiosqlite.Row
+        await conn.executescript(_CONNECTION_PRAGMAS)
+        return conn
 
     @asynccontextmanager
     async def get_connection(self) -> AsyncIterator[aiosqlite.Connection]:
         """Get database connection from pool."""
+        pinned = self._transaction.get()
+        if pinned is not None:
+            yield pinned
+            return
+
         async with self._pool_lock:
-            if self._connection_pool:
-                conn = self._connection_pool.pop()
-            else:
-                conn = await aiosqlite.connect(self.database_path)
-                conn.row_factory = aiosqlite.Row
-                await conn.execute("PRAGMA foreign_keys = ON")
+            conn = self._connection_pool.pop() if self._connection_pool else None
+        # Open overflow connections outside the lock so releases aren't held up
+        if conn is None:
+            conn = await self._connect()
 
         try:
             yield conn
@@ -263,6 +334,42 @@ class DatabaseManager:
                 else:
                     await conn.close()
 
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Group repository writes into one transaction with a single commit.
+
+        Every ``get_connection()`` inside the block, including those made by
+        repositories, reuses one connection whose ``commit()`` is deferred.
+        The block commits on exit and rolls back if it raises. Nested blocks
+        join the outer transaction.
+        """
+        pinned = self._transaction.get()
+        if pinned is not None:
+            yield pinned
+            return
+
+        async with self.get_connection() as conn:
+            pinned = cast(aiosqlite.Connection, _TransactionConnection(conn))
+            token = self._transaction.set(pinned)
+            try:
+                yield pinned
+            except BaseException:
+                await conn.rollback()
+                # Reads inside the block may have cached rolled-back rows
+                self.mark_written()
+                raise
+            else:
+                await conn.commit()
+                # Writes inside the block bumped the version before this real
+                # commit, so stats read in between may have cached old rows
+                self.mark_written()
+            finally:
+                self._transaction.reset(token)
+
+    def mark_written(self) -> None:
+        """Invalidate aggregates cached against the current write version."""
+        self.write_version += 1
+
     async def close(self):
         """Close all connections in pool."""
         logger.info("Closing database connections")
@@ -27,7 +27,7 @@ from .repositories import (
     UserRepository,
 )
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 class Storage:
@@ -77,74 +77,81 @@ class Storage:
             cost=response.cost,
         )
 
-        # Save message
-        message = MessageModel(
-            message_id=None,
-            session_id=session_id,
-            user_id=user_id,
-            timestamp=datetime.utcnow(),
-            prompt=prompt,
-            response=response.content,
-            cost=response.cost,
-            duration_ms=response.duration_ms,
-            error=response.error_type if response.is_error else None,
-        )
+        # One commit for the message, tool usage, stats and audit rows
+        async with self.db_manager.transaction():
+            # Save message
+            message = MessageModel(
+                message_id=None,
+                session_id=session_id,
+                user_id=user_id,
+                timestamp=datetime.utcnow(),
+                prompt=prompt,
+                response=response.content,
+                cost=response.cost,
+                duration_ms=response.duration_ms,
+                error=response.error_type if response.is_error else None,
+            )
 
-        message_id = await self.messages.save_message(message)
-
-        # Save tool usage
-        if response.tools_used:
-            for tool in response.tools_used:
-                tool_usage = ToolUsageModel(
-                    id=None,
-                    session_id=session_id,
-                    message_id=message_id,
-                    tool_name=tool["name"],
-                    tool_input=tool.get("input", {}),
-                    timestamp=datetime.utcnow(),
-                    success=not response.is_error,
-                    error_message=response.error_type if response.is_error else None,
+            message_id = await self.messages.save_message(message)
+
+            # Save tool usage
+            if response.tools_used:
+                timestamp = datetime.utcnow()
+                error_message = response.error_type if response.is_error else None
+                await self.tools.bulk_save(
+                    [
+                        ToolUsageModel(
+                            id=None,
+                            session_id=session_id,
+                            message_id=message_id,
+                            tool_name=tool["name"],
+                            tool_input=tool.get("input", {}),
+                            timestamp=timestamp,
+                            success=not response.is_error,
+                            error_message=error_message,
+                        )
+                        for tool in response.tools_used
+                    ]
                 )
-                await self.tools.save_tool_usage(tool_usage)
-
-        # Update cost tracking
-        await self.costs.update_daily_cost(user_id, response.cost)
-
-        # Update user stats
-        user = await self.users.get_user(user_id)
-        if user:
-            user.total_cost += response.cost
-            user.message_count += 1
-            user.last_active = datetime.utcnow()
-            await self.users.update_user(user)
 
-        # Update session stats
-        session = await self.sessions.get_session(session_id)
-        if session:
-            session.total_cost += response.cost
-            session.total_turns += response.num_turns
-            session.message_count += 1
-            session.last_used = datetime.utcnow()
-            await self.sessions.update_session(session)
-
-        # Log audit event
-        audit_event = AuditLogModel(
-            id=None,
-            user_id=user_id,
-            event_type="claude_interaction",
-            event_data={
-                "session_id": session_id,
-                "cost": response.cost,
-                "duration_ms": response.duration_ms,
-                "num_turns": response.num_turns,
-                "is_error": response.is_error,
-                "tools_used": [t["name"] for t in response.tools_used],
-            },
-            success=not response.is_error,
-            timestamp=datetime.utcnow(),
-            ip_address=ip_address,
-        )
-        await self.audit.log_event(audit_event)
+            # Update cost tracking
+            await self.costs.update_daily_cost(user_id, response.cost)
+
+            # Update user stats
+            user = await self.users.get_user(user_id)
+            if user:
+                user.total_cost += response.cost
+                user.message_count += 1
+                user.last_active = datetime.utcnow()
+                await self.users.update_user(user)
+
+            # Update session stats
+            session = await self.sessions.get_session(session_id)
+            if session:
+                session.total_cost += response.cost
+                session.total_turns += response.num_turns
+                session.message_count += 1
+                session.last_used = datetime.utcnow()
+                await self.sessions.update_session(session)
+
+            # Log audit event
+            audit_event = AuditLogModel(
+                id=None,
+                user_id=user_id,
+                event_type="claude_interaction",
+                event_data={
+                    "session_id": session_id,
+                    "cost": response.cost,
+                    "duration_ms": response.duration_ms,
+                    "num_turns": response.num_turns,
+                    "is_error": response.is_error,
+                    "tools_used": [t["name"] for t in response.tools_used],
+                },
+                success=not response.is_error,
+                timestamp=datetime.utcnow(),
+                ip_address=ip_address,
+            )
+            await self.audit.log_event(audit_event)
 
     async def get_or_create_user(
         self, user_id: int, username: Optional[str] = None
@@ -229,8 +236,7 @@ class Storage:
 
     async def is_user_allowed(self, user_id: int) -> bool:
         """Check if user is allowed."""
-        user = await self.users.get_user(user_id)
-        return user.is_allowed if user else False
+        return await self.users.is_allowed(user_id)
 
     async def get_user_session_summary(self, user_id: int) -> Dict[str, Any]:
         """Get user session summary."""
@@ -9,6 +9,7 @@ from datetime import datetime
 from typing import Any, Dict, Optional
 
 import aiosqlite
+import orjson
 
 
 @dataclass
@@ -43,6 +44,10 @@ class UserModel:
             if data.get(field):
                 data[field] = datetime.fromisoformat(data[field])
 
+        # Placeholder records created by audit storage are not yet allowed
+        if data.get("is_allowed") is None:
+            data["is_allowed"] = False
+
         return cls(**data)
 
 
@@ -145,7 +150,7 @@ class ToolUsageModel:
             data["timestamp"] = data["timestamp"].isoformat()
         # Convert tool_input to JSON string if present
         if data["tool_input"]:
-            data["tool_input"] = json.dumps(data["tool_input"])
+            data["tool_input"] = orjson.dumps(data["tool_input"]).decode()
         return data
 
     @classmethod
@@ -160,8 +165,8 @@ class ToolUsageModel:
         # Parse JSON fields
         if data.get("tool_input"):
             try:
-                data["tool_input"] = json.loads(data["tool_input"])
-            except (json.JSONDecodeError, TypeError):
+                data["tool_input"] = orjson.loads(data["tool_input"])
+            except (orjson.JSONDecodeError, TypeError):
                 data["tool_input"] = {}
 
         return cls(**data)
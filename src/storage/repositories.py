@@ -6,10 +6,13 @@ Features:
 - Error handling
 """
 
+import copy
 import json
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 import structlog
 
 from .database import DatabaseManager
@@ -22,7 +25,7 @@ from .models import (
     UserModel,
 )
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 class UserRepository:
@@ -58,6 +61,7 @@ class UserRepository:
                 ),
             )
             await conn.commit()
+            self.db.mark_written()
 
             logger.info(
                 "Created user", user_id=user.user_id, username=user.telegram_username
@@ -84,6 +88,7 @@ class UserRepository:
                 ),
             )
             await conn.commit()
+            self.db.mark_written()
 
     async def get_allowed_users(self) -> List[int]:
         """Get list of allowed user IDs."""
@@ -94,6 +99,15 @@ class UserRepository:
             rows = await cursor.fetchall()
             return [row[0] for row in rows]
 
+    async def is_allowed(self, user_id: int) -> bool:
+        """Check whether a user is allowed without loading the record."""
+        async with self.db.get_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT 1 FROM users WHERE user_id = ? AND is_allowed = TRUE LIMIT 1",
+                (user_id,),
+            )
+            return await cursor.fetchone() is not None
+
     async def set_user_allowed(self, user_id: int, allowed: bool):
         """Set user allowed status."""
         async with self.db.get_connection() as conn:
@@ -101,6 +115,7 @@ class UserRepository:
                 "UPDATE users SET is_allowed = ? WHERE user_id = ?", (allowed, user_id)
             )
             await conn.commit()
+            self.db.mark_written()
 
             logger.info("Updated user permissions", user_id=user_id, allowed=allowed)
 
@@ -128,24 +143,29 @@ class SessionRepository:
             row = await cursor.fetchone()
             return SessionModel.from_row(row) if row else None
 
+    _INSERT_SQL = """
+        INSERT INTO sessions
+        (session_id, user_id, project_path, created_at, last_used)
+        VALUES (?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _insert_params(session: SessionModel) -> Tuple[Any, ...]:
+        """Build the INSERT parameters for a session."""
+        return (
+            session.session_id,
+            session.user_id,
+            session.project_path,
+            session.created_at,
+            session.last_used,
+        )
+
     async def create_session(self, session: SessionModel) -> SessionModel:
         """Create new session."""
         async with self.db.get_connection() as conn:
-            await conn.execute(
-                """
-                INSERT INTO sessions 
-                (session_id, user_id, project_path, created_at, last_used)
-                VALUES (?, ?, ?, ?, ?)
-            """,
-                (
-                    session.session_id,
-                    session.user_id,
-                    session.project_path,
-                    session.created_at,
-                    session.last_used,
-                ),
-            )
+            await conn.execute(self._INSERT_SQL, self._insert_params(session))
             await conn.commit()
+            self.db.mark_written()
 
             logger.info(
                 "Created session",
@@ -154,6 +174,17 @@ class SessionRepository:
             )
             return session
 
+    async def bulk_create_sessions(self, sessions: List[SessionModel]) -> None:
+        """Create several sessions with one prepared statement and commit."""
+        async with self.db.get_connection() as conn:
+            await conn.executemany(
+                self._INSERT_SQL, [self._insert_params(s) for s in sessions]
+            )
+            await conn.commit()
+            self.db.mark_written()
+
+        logger.info("Created sessions", count=len(sessions))
+
     async def update_session(self, session: SessionModel):
         """Update session data."""
         async with self.db.get_connection() as conn:
@@ -174,6 +205,7 @@ class SessionRepository:
                 ),
             )
             await conn.commit()
+            self.db.mark_written()
 
     async def get_user_sessions(
         self, user_id: int, active_only: bool = True
@@ -192,19 +224,33 @@ class SessionRepository:
             rows = await cursor.fetchall()
             return [SessionModel.from_row(row) for row in rows]
 
+    async def count_user_sessions(self, user_id: int, active_only: bool = True) -> int:
+        """Count sessions for user without loading them."""
+        query = "SELECT COUNT(*) FROM sessions WHERE user_id = ?"
+        if active_only:
+            query += " AND is_active = TRUE"
+
+        async with self.db.get_connection() as conn:
+            cursor = await conn.execute(query, (user_id,))
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
     async def cleanup_old_sessions(self, days: int = 30) -> int:
-        """Mark old sessions as inactive."""
+        """Mark old sessions as inactive in a single statement."""
+        # Sessions are kept for their messages and tool usage, which reference
+        # them, so this deactivates rather than deletes
         async with self.db.get_connection() as conn:
             cursor = await conn.execute(
                 """
-                UPDATE sessions 
-                SET is_active = FALSE 
-                WHERE last_used < datetime('now', '-' || ? || ' days')
+                UPDATE sessions
+                SET is_active = FALSE
+                WHERE last_used < datetime('now', ?)
                   AND is_active = TRUE
             """,
-                (days,),
+                (f"-{int(days)} days",),
             )
             await conn.commit()
+            self.db.mark_written()
 
             affected = cursor.rowcount
             logger.info("Cleaned up old sessions", count=affected, days=days)
@@ -253,6 +299,7 @@ class MessageRepository:
                 ),
             )
             await conn.commit()
+            self.db.mark_written()
             return cursor.lastrowid
 
     async def get_session_messages(
@@ -311,32 +358,48 @@ class ToolUsageRepository:
         """Initialize repository."""
         self.db = db_manager
 
+    _INSERT_SQL = """
+        INSERT INTO tool_usage
+        (session_id, message_id, tool_name, tool_input, timestamp, success, error_message)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _insert_params(tool_usage: ToolUsageModel) -> Tuple[Any, ...]:
+        """Build the INSERT parameters for a tool usage record."""
+        return (
+            tool_usage.session_id,
+            tool_usage.message_id,
+            tool_usage.tool_name,
+            (
+                orjson.dumps(tool_usage.tool_input).decode()
+                if tool_usage.tool_input
+                else None
+            ),
+            tool_usage.timestamp,
+            tool_usage.success,
+            tool_usage.error_message,
+        )
+
     async def save_tool_usage(self, tool_usage: ToolUsageModel) -> int:
         """Save tool usage and return ID."""
         async with self.db.get_connection() as conn:
-            tool_input_json = (
-                json.dumps(tool_usage.tool_input) if tool_usage.tool_input else None
-            )
-
             cursor = await conn.execute(
-                """
-                INSERT INTO tool_usage 
-                (session_id, message_id, tool_name, tool_input, timestamp, success, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    tool_usage.session_id,
-                    tool_usage.message_id,
-                    tool_usage.tool_name,
-                    tool_input_json,
-                    tool_usage.timestamp,
-                    tool_usage.success,
-                    tool_usage.error_message,
-                ),
+                self._INSERT_SQL, self._insert_params(tool_usage)
             )
             await conn.commit()
+            self.db.mark_written()
             return cursor.lastrowid
 
+    async def bulk_save(self, tool_usages: List[ToolUsageModel]) -> None:
+        """Save several tool usage records with one prepared statement."""
+        async with self.db.get_connection() as conn:
+            await conn.executemany(
+                self._INSERT_SQL, [self._insert_params(t) for t in tool_usages]
+            )
+            await conn.commit()
+            self.db.mark_written()
+
     async def get_session_tool_usage(self, session_id: str) -> List[ToolUsageModel]:
         """Get tool usage for session."""
         async with self.db.get_connection() as conn:
@@ -366,22 +429,29 @@ class ToolUsageRepository:
             rows = await cursor.fetchall()
             return [ToolUsageModel.from_row(row) for row in rows]
 
-    async def get_tool_stats(self) -> List[Dict[str, any]]:
-        """Get tool usage statistics."""
+    async def get_tool_stats(
+        self, tool_name: Optional[str] = None
+    ) -> List[Dict[str, any]]:
+        """Get tool usage statistics, optionally for a single tool."""
+        query = """
+            SELECT
+                tool_name,
+                COUNT(*) as usage_count,
+                COUNT(DISTINCT session_id) as sessions_used,
+                SUM(CASE WHEN success = TRUE THEN 1 ELSE 0 END) as success_count,
+                SUM(CASE WHEN success = FALSE THEN 1 ELSE 0 END) as error_count
+            FROM tool_usage
+        """
+        params = []
+
+        if tool_name is not None:
+            query += " WHERE tool_name = ?"
+            params.append(tool_name)
+
+        query += " GROUP BY tool_name ORDER BY usage_count DESC"
+
         async with self.db.get_connection() as conn:
-            cursor = await conn.execute(
-                """
-                SELECT 
-                    tool_name,
-                    COUNT(*) as usage_count,
-                    COUNT(DISTINCT session_id) as sessions_used,
-                    SUM(CASE WHEN success = TRUE THEN 1 ELSE 0 END) as success_count,
-                    SUM(CASE WHEN success = FALSE THEN 1 ELSE 0 END) as error_count
-                FROM tool_usage
-                GROUP BY tool_name
-                ORDER BY usage_count DESC
-            """
-            )
+            cursor = await conn.execute(query, params)
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
@@ -416,6 +486,7 @@ class AuditLogRepository:
                 ),
             )
             await conn.commit()
+            self.db.mark_written()
             return cursor.lastrowid
 
     async def get_user_audit_log(
@@ -475,6 +546,7 @@ class CostTrackingRepository:
                 (user_id, date, cost, cost),
             )
             await conn.commit()
+            self.db.mark_written()
 
     async def get_user_daily_costs(
         self, user_id: int, days: int = 30
@@ -514,11 +586,18 @@ class CostTrackingRepository:
 
 
 class AnalyticsRepository:
-    """Analytics and reporting."""
+    """Analytics and reporting.
 
-    def __init__(self, db_manager: DatabaseManager):
+    System stats are cached until a user, message or tool usage write bumps
+    the database write version, or for at most ``stats_ttl_seconds`` since
+    their rolling day windows move with the clock.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, stats_ttl_seconds: float = 60):
         """Initialize repository."""
         self.db = db_manager
+        self.stats_ttl_seconds = stats_ttl_seconds
+        self._system_stats_cache: Optional[Tuple[int, float, Dict[str, any]]] = None
 
     async def get_user_stats(self, user_id: int) -> Dict[str, any]:
         """Get user statistics."""
@@ -584,7 +663,24 @@ class AnalyticsRepository:
             }
 
     async def get_system_stats(self) -> Dict[str, any]:
-        """Get system-wide statistics."""
+        """Get system-wide statistics, reusing a cached result if still valid."""
+        version = self.db.write_version
+        now = time.monotonic()
+        cached = self._system_stats_cache
+        if (
+            cached is not None
+            and cached[0] == version
+            and now - cached[1] < self.stats_ttl_seconds
+        ):
+            # Hand out a copy so callers can't alter the cached stats
+            return copy.deepcopy(cached[2])
+
+        stats = await self._query_system_stats()
+        self._system_stats_cache = (version, now, stats)
+        return copy.deepcopy(stats)
+
+    async def _query_system_stats(self) -> Dict[str, any]:
+        """Run the system-wide statistics queries."""
         async with self.db.get_connection() as conn:
             # Overall stats
             cursor = await conn.execute(
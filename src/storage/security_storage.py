@@ -0,0 +1,218 @@
+"""Persistent security storage implementations.
+
+Replaces the in-memory audit and token storage with SQLite persistence.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+import structlog
+
+from ..security.audit import AuditEvent, AuditStorage
+from ..security.auth import TokenStorage
+from .database import DatabaseManager
+from .models import AuditLogModel, UserTokenModel
+
+logger = structlog.get_logger(__name__)
+
+
+async def _ensure_user_exists(conn: aiosqlite.Connection, user_id: int) -> None:
+    """Create a placeholder user record so foreign keys hold for unknown users."""
+    # Audit events are also written for users that failed authentication, so
+    # is_allowed is left NULL (undecided) for session storage to fill in once
+    # the user starts a session; until then they don't count as allowed
+    now = datetime.utcnow()
+    await conn.execute(
+        """
+        INSERT OR IGNORE INTO users (user_id, first_seen, last_active, is_allowed)
+        VALUES (?, ?, ?, NULL)
+    """,
+        (user_id, now, now),
+    )
+
+
+class SQLiteAuditStorage(AuditStorage):
+    """SQLite-based audit event storage."""
+
+    def __init__(self, db_manager: DatabaseManager):
+        """Initialize with database manager."""
+        self.db_manager = db_manager
+
+    async def store_event(self, event: AuditEvent) -> None:
+        """Store audit event in the audit_log table."""
+        # audit_log has no columns for these, so they travel in event_data
+        event_data = {
+            "details": event.details,
+            "session_id": event.session_id,
+            "risk_level": event.risk_level,
+        }
+
+        async with self.db_manager.get_connection() as conn:
+            await _ensure_user_exists(conn, event.user_id)
+            await conn.execute(
+                """
+                INSERT INTO audit_log
+                (user_id, event_type, event_data, success, timestamp, ip_address)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    event.user_id,
+                    event.event_type,
+                    json.dumps(event_data, default=str),
+                    event.success,
+                    event.timestamp,
+                    event.ip_address,
+                ),
+            )
+            await conn.commit()
+            self.db_manager.mark_written()
+
+        # Log high-risk events immediately
+        if event.risk_level in ["high", "critical"]:
+            logger.warning(
+                "High-risk security event",
+                event_type=event.event_type,
+                user_id=event.user_id,
+                risk_level=event.risk_level,
+                details=event.details,
+            )
+
+    async def get_events(
+        self,
+        user_id: Optional[int] = None,
+        event_type: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[AuditEvent]:
+        """Get filtered events, newest first."""
+        conditions = []
+        params: List[Any] = []
+
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+
+        if event_type is not None:
+            conditions.append("event_type = ?")
+            params.append(event_type)
+
+        if start_time is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start_time)
+
+        if end_time is not None:
+            conditions.append("timestamp <= ?")
+            params.append(end_time)
+
+        query = "SELECT * FROM audit_log"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC LIMIT ?"
+        params.append(limit)
+
+        async with self.db_manager.get_connection() as conn:
+            cursor = await conn.execute(query, params)
+            rows = await cursor.fetchall()
+
+        return [self._row_to_event(row) for row in rows]
+
+    async def get_security_violations(
+        self, user_id: Optional[int] = None, limit: int = 100
+    ) -> List[AuditEvent]:
+        """Get security violations."""
+        return await self.get_events(
+            user_id=user_id, event_type="security_violation", limit=limit
+        )
+
+    @staticmethod
+    def _row_to_event(row: aiosqlite.Row) -> AuditEvent:
+        """Convert an audit_log row to an AuditEvent."""
+        model = AuditLogModel.from_row(row)
+        event_data = model.event_data or {}
+
+        return AuditEvent(
+            timestamp=model.timestamp,
+            user_id=model.user_id,
+            event_type=model.event_type,
+            success=bool(model.success),
+            # Rows logged through AuditLogRepository carry plain event data
+            details=event_data.get("details", event_data),
+            ip_address=model.ip_address,
+            session_id=event_data.get("session_id"),
+            risk_level=event_data.get("risk_level", "low"),
+        )
+
+
+class SQLiteTokenStorage(TokenStorage):
+    """SQLite-based token storage."""
+
+    def __init__(self, db_manager: DatabaseManager):
+        """Initialize with database manager."""
+        self.db_manager = db_manager
+
+    async def store_token(
+        self, user_id: int, token_hash: str, expires_at: datetime
+    ) -> None:
+        """Store token hash, replacing any active token for the user."""
+        async with self.db_manager.get_connection() as conn:
+            await _ensure_user_exists(conn, user_id)
+            await conn.execute(
+                """
+                UPDATE user_tokens SET is_active = FALSE
+                WHERE user_id = ? AND is_active = TRUE
+            """,
+                (user_id,),
+            )
+            await conn.execute(
+                """
+                INSERT INTO user_tokens (user_id, token_hash, created_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                (user_id, token_hash, datetime.utcnow(), expires_at),
+            )
+            await conn.commit()
+            self.db_manager.mark_written()
+
+        logger.debug("Token stored in database", user_id=user_id)
+
+    async def get_user_token(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get the active, unexpired token for user."""
+        async with self.db_manager.get_connection() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT * FROM user_tokens
+                WHERE user_id = ? AND is_active = TRUE AND expires_at > ?
+                ORDER BY created_at DESC
+                LIMIT 1
+            """,
+                (user_id, datetime.utcnow()),
+            )
+            row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        token = UserTokenModel.from_row(row)
+        return {
+            "hash": token.token_hash,
+            "expires_at": token.expires_at,
+            "created_at": token.created_at,
+        }
+
+    async def revoke_token(self, user_id: int) -> None:
+        """Deactivate the user's tokens."""
+        async with self.db_manager.get_connection() as conn:
+            await conn.execute(
+                """
+                UPDATE user_tokens SET is_active = FALSE
+                WHERE user_id = ? AND is_active = TRUE
+            """,
+                (user_id,),
+            )
+            await conn.commit()
+            self.db_manager.mark_written()
+
+        logger.debug("Token revoked in database", user_id=user_id)
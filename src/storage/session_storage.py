@@ -7,13 +7,14 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
+import aiosqlite
 import structlog
 
 from ..claude.session import ClaudeSession, SessionStorage
 from .database import DatabaseManager
 from .models import SessionModel, UserModel
 
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 
 
 class SQLiteSessionStorage(SessionStorage):
@@ -24,45 +25,36 @@ class SQLiteSessionStorage(SessionStorage):
         self.db_manager = db_manager
 
     async def _ensure_user_exists(
-        self, user_id: int, username: Optional[str] = None
+        self,
+        conn: aiosqlite.Connection,
+        user_id: int,
+        username: Optional[str] = None,
     ) -> None:
         """Ensure user exists in database before creating session."""
-        async with self.db_manager.get_connection() as conn:
-            # Check if user exists
-            cursor = await conn.execute(
-                "SELECT user_id FROM users WHERE user_id = ?", (user_id,)
-            )
-            user_exists = await cursor.fetchone()
-
-            if not user_exists:
-                # Create user record
-                now = datetime.utcnow()
-                await conn.execute(
-                    """
-                    INSERT INTO users (user_id, telegram_username, first_seen, last_active, is_allowed)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        user_id,
-                        username,
-                        now,
-                        now,
-                        True,
-                    ),  # Allow user by default for now
-                )
-                await conn.commit()
+        now = datetime.utcnow()
+        cursor = await conn.execute(
+            """
+            INSERT INTO users (user_id, telegram_username, first_seen, last_active, is_allowed)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                telegram_username = COALESCE(
+                    users.telegram_username, excluded.telegram_username
+                ),
+                is_allowed = excluded.is_allowed
+            WHERE users.is_allowed IS NULL  -- placeholder from audit storage
+            """,
+            (user_id, username, now, now, True),  # Allow user by default for now
+        )
 
-                logger.info(
-                    "Created user record for session",
-                    user_id=user_id,
-                    username=username,
-                )
+        if cursor.rowcount:
+            logger.info(
+                "Created or completed user record for session",
+                user_id=user_id,
+                username=username,
+            )
 
     async def save_session(self, session: ClaudeSession) -> None:
         """Save session to database."""
-        # Ensure user exists before creating session
-        await self._ensure_user_exists(session.user_id)
-
         session_model = SessionModel(
             session_id=session.session_id,
             user_id=session.user_id,
@@ -75,44 +67,36 @@ class SQLiteSessionStorage(SessionStorage):
         )
 
         async with self.db_manager.get_connection() as conn:
-            # Try to update first
-            cursor = await conn.execute(
+            # Ensure user exists before creating session
+            await self._ensure_user_exists(conn, session.user_id)
+
+            # Upsert in place: existing rows keep their owner, path and
+            # creation time, and are never deleted and reinserted
+            await conn.execute(
                 """
-                UPDATE sessions 
-                SET last_used = ?, total_cost = ?, total_turns = ?, message_count = ?
-                WHERE session_id = ?
+                INSERT INTO sessions
+                (session_id, user_id, project_path, created_at, last_used,
+                 total_cost, total_turns, message_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    last_used = excluded.last_used,
+                    total_cost = excluded.total_cost,
+                    total_turns = excluded.total_turns,
+                    message_count = excluded.message_count
             """,
                 (
+                    session_model.session_id,
+                    session_model.user_id,
+                    session_model.project_path,
+                    session_model.created_at,
                     session_model.last_used,
                     session_model.total_cost,
                     session_model.total_turns,
                     session_model.message_count,
-                    session_model.session_id,
                 ),
             )
-
-            # If no rows were updated, insert new record
-            if cursor.rowcount == 0:
-                await conn.execute(
-                    """
-                    INSERT INTO sessions 
-                    (session_id, user_id, project_path, created_at, last_used, 
-                     total_cost, total_turns, message_count)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        session_model.session_id,
-                        session_model.user_id,
-                        session_model.project_path,
-                        session_model.created_at,
-                        session_model.last_used,
-                        session_model.total_cost,
-                        session_model.total_turns,
-                        session_model.message_count,
-                    ),
-                )
-
             await conn.commit()
+            self.db_manager.mark_written()
 
         logger.debug(
             "Session saved to database",
@@ -143,7 +127,7 @@ class SQLiteSessionStorage(SessionStorage):
                 total_cost=session_model.total_cost,
                 total_turns=session_model.total_turns,
                 message_count=session_model.message_count,
-                tools_used=[],  # Tools are tracked separately in tool_usage table
+                tools_used=set(),  # Tools are tracked separately in tool_usage table
             )
 
             logger.debug(
@@ -162,6 +146,7 @@ class SQLiteSessionStorage(SessionStorage):
                 (session_id,),
             )
             await conn.commit()
+            self.db_manager.mark_written()
 
         logger.debug("Session marked as inactive", session_id=session_id)
 
@@ -190,7 +175,7 @@ class SQLiteSessionStorage(SessionStorage):
                     total_cost=session_model.total_cost,
                     total_turns=session_model.total_turns,
                     message_count=session_model.message_count,
-                    tools_used=[],  # Tools are tracked separately
+                    tools_used=set(),  # Tools are tracked separately
                 )
                 sessions.append(claude_session)
 
@@ -216,7 +201,7 @@ class SQLiteSessionStorage(SessionStorage):
                     total_cost=session_model.total_cost,
                     total_turns=session_model.total_turns,
                     message_count=session_model.message_count,
-                    tools_used=[],  # Tools are tracked separately
+                    tools_used=set(),  # Tools are tracked separately
                 )
                 sessions.append(claude_session)
 
@@ -235,6 +220,7 @@ class SQLiteSessionStorage(SessionStorage):
                 (timeout_hours,),
             )
             await conn.commit()
+            self.db_manager.mark_written()
 
             affected = cursor.rowcount
             logger.info(
@@ -8,6 +8,7 @@ APP_DESCRIPTION = "Telegram bot for remote Claude Code access"
 DEFAULT_CLAUDE_TIMEOUT_SECONDS = 300
 DEFAULT_CLAUDE_MAX_TURNS = 10
 DEFAULT_CLAUDE_MAX_COST_PER_USER = 10.0
+DEFAULT_CLAUDE_STDOUT_BUFFER_LIMIT = 4 * 1024 * 1024
 
 DEFAULT_RATE_LIMIT_REQUESTS = 10
 DEFAULT_RATE_LIMIT_WINDOW = 60
@@ -16,6 +17,11 @@ DEFAULT_RATE_LIMIT_BURST = 20
 DEFAULT_SESSION_TIMEOUT_HOURS = 24
 DEFAULT_MAX_SESSIONS_PER_USER = 5
 
+DEFAULT_SHUTDOWN_STEP_TIMEOUT_SECONDS = 10
+
+# Monitoring
+DEFAULT_MAX_VIOLATIONS_RETAINED = 10000
+
 # Message limits
 TELEGRAM_MAX_MESSAGE_LENGTH = 4096
 SAFE_MESSAGE_LENGTH = 4000  # Leave room for formatting
@@ -1,6 +1,19 @@
 """Pytest configuration and fixtures."""
 
 import pytest
+import pytest_asyncio
+
+
+def pytest_collection_modifyitems(items):
+    """Run every async test on the session event loop.
+
+    Async fixtures default to the same loop (see pyproject.toml), so the loop
+    is created once and shared objects never cross loops.
+    """
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
 
 
 @pytest.fixture
@@ -128,6 +128,14 @@ class TestResponseFormatter:
         assert "📄 file2.js" in msg.text
         assert "📁 directory/" in msg.text
 
+    def test_format_file_list_truncates(self, formatter):
+        """Test long listings show 50 entries and a remainder note."""
+        files = [f"file{i}.py" for i in range(53)]
+        msg = formatter.format_file_list(files, "big")
+
+        assert msg.text.count("📄") == 50
+        assert msg.text.endswith("📄 file49.py\n\n_... and 3 more items_")
+
     def test_format_empty_file_list(self, formatter):
         """Test formatting empty file list."""
         msg = formatter.format_file_list([], "empty_dir")
@@ -161,6 +169,12 @@ class TestResponseFormatter:
         # Should reduce multiple newlines
         assert "\n\n\n" not in cleaned
 
+    def test_clean_text_strips_and_escapes(self, formatter):
+        """Test cleaning trims, collapses blank runs and escapes outside code."""
+        text = "\n\n  my_var\n\n\n\n```\nx_y\n```\n\n\n"
+
+        assert formatter._clean_text(text) == "my\\_var\n\n```\nx_y\n```"
+
     def test_markdown_escaping(self, formatter):
         """Test markdown character escaping outside code blocks."""
         text_with_markdown = "This has *bold* and _italic_ text"
@@ -177,6 +191,15 @@ class TestResponseFormatter:
         # Code block content should not be escaped
         assert "code_with_underscores" in result
 
+    def test_inline_code_preservation(self, formatter):
+        """Test that inline code keeps its characters while text is escaped."""
+        text = "Run `my_script *.py` on a_file\n```\nx = a*b\n```\nthen *done*"
+        result = formatter._escape_markdown_outside_code(text)
+
+        assert result == (
+            "Run `my_script *.py` on a\\_file\n```\nx = a*b\n```\nthen \\*done\\*"
+        )
+
     def test_truncate_long_code_block(self, formatter):
         """Test truncation of very long code blocks."""
         long_code = "x" * 4000
@@ -243,6 +266,23 @@ class TestResponseFormatter:
             # Should be balanced or have one extra opening (continued in next message)
             assert abs(opening_count - closing_count) <= 1
 
+    def test_split_very_long_line_in_code_block(self, formatter):
+        """Test a single oversized line is cut and each part keeps its fence."""
+        line = "y" * (formatter.max_message_length * 2)
+        text = f"```\n{line}\n```"
+
+        messages = formatter._split_message(text)
+
+        assert len(messages) == 3
+        assert (
+            "".join(m.text.replace("```", "").replace("\n", "") for m in messages)
+            == line
+        )
+        for msg in messages:
+            assert len(msg.text) <= formatter.max_message_length
+            assert msg.text.startswith("```\n")
+            assert msg.text.endswith("\n```")
+
 
 class TestProgressIndicator:
     """Test ProgressIndicator utility functions."""
@@ -330,6 +370,13 @@ class TestCodeHighlighter:
 
         assert "```javascript\n" in formatted
 
+    def test_detect_language_uses_last_suffix(self):
+        """Test only the final suffix of the file name is considered."""
+        assert CodeHighlighter.detect_language("src/App.TSX") == "typescript"
+        assert CodeHighlighter.detect_language("archive.tar.gz") == ""
+        assert CodeHighlighter.detect_language("config.d/settings") == ""
+        assert CodeHighlighter.detect_language(".bash") == ""
+
     def test_language_extensions_coverage(self):
         """Test that language extensions are properly mapped."""
         # Test a few key extensions
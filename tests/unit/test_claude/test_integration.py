@@ -0,0 +1,454 @@
+"""Test Claude Code subprocess integration."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.claude.exceptions import ClaudeProcessError, ClaudeTimeoutError
+from src.claude.integration import (
+    ClaudeProcessManager,
+    StreamUpdate,
+    _AssistantTextBatcher,
+)
+from src.config.settings import Settings
+
+
+def make_process(stdout: bytes, stderr: bytes = b"", return_code: int = 0):
+    """Create a fake subprocess whose pipes yield the given bytes."""
+    process = MagicMock()
+    process.stdout = asyncio.StreamReader()
+    process.stdout.feed_data(stdout)
+    process.stdout.feed_eof()
+    process.stderr = asyncio.StreamReader()
+    process.stderr.feed_data(stderr)
+    process.stderr.feed_eof()
+    process.wait = AsyncMock(return_value=return_code)
+    return process
+
+
+class TestClaudeProcessManager:
+    """Test Claude process manager."""
+
+    @pytest.fixture
+    def config(self, tmp_path):
+        """Create test config."""
+        return Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            claude_timeout_seconds=1,
+        )
+
+    @pytest.fixture
+    def process_manager(self, config):
+        """Create process manager."""
+        return ClaudeProcessManager(config)
+
+    def test_parse_assistant_message_single_block(self, process_manager):
+        """Test assistant message with a single text block."""
+        msg = {
+            "type": "assistant",
+            "message": {"content": [{"type": "text", "text": "Hello"}]},
+        }
+
+        update = process_manager._parse_assistant_message(msg)
+
+        assert update.type == "assistant"
+        assert update.content == "Hello"
+        assert update.tool_calls is None
+
+    def test_parse_assistant_message_multiple_blocks(self, process_manager):
+        """Test assistant message with text and tool blocks."""
+        msg = {
+            "type": "assistant",
+            "message": {
+                "content": [
+                    {"type": "text", "text": "First"},
+                    {"type": "tool_use", "name": "Read", "input": {}, "id": "t1"},
+                    {"type": "text", "text": "Second"},
+                    {"type": "text", "text": "Third"},
+                ]
+            },
+        }
+
+        update = process_manager._parse_assistant_message(msg)
+
+        assert update.content == "First\nSecond\nThird"
+        assert update.get_tool_names() == ["Read"]
+
+    def test_parse_assistant_message_without_text(self, process_manager):
+        """Test assistant message with only tool calls."""
+        msg = {
+            "type": "assistant",
+            "message": {"content": [{"type": "tool_use", "name": "Bash", "input": {}}]},
+        }
+
+        update = process_manager._parse_assistant_message(msg)
+
+        assert update.content is None
+        assert update.get_tool_names() == ["Bash"]
+
+    def test_parse_user_message_blocks(self, process_manager):
+        """Test user message with block and string content."""
+        single = {"type": "user", "message": {"content": ["Hi"]}}
+        multiple = {
+            "type": "user",
+            "message": {"content": [{"type": "text", "text": "Hi"}, "there"]},
+        }
+        empty = {"type": "user", "message": {"content": []}}
+
+        assert process_manager._parse_user_message(single).content == "Hi"
+        assert process_manager._parse_user_message(multiple).content == "Hi\nthere"
+        assert process_manager._parse_user_message(empty).content is None
+
+    def test_build_command_includes_allowed_tools(self, process_manager, config):
+        """Test command contains the configured allowed tools."""
+        cmd = process_manager._build_command("Hello", None, False)
+
+        assert cmd[1:3] == ["-p", "Hello"]
+        assert "--allowedTools" in cmd
+        assert cmd[cmd.index("--allowedTools") + 1] == ",".join(
+            config.claude_allowed_tools
+        )
+
+    def test_build_command_without_allowed_tools(self, tmp_path):
+        """Test command omits allowed tools when none are configured."""
+        config = Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            claude_allowed_tools=[],
+        )
+        cmd = ClaudeProcessManager(config)._build_command("Hello", None, False)
+
+        assert "--allowedTools" not in cmd
+
+    def test_build_command_resume_session(self, tmp_path):
+        """Test follow-up prompts resume the session before the shared tail."""
+        config = Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            claude_allowed_tools=["Read"],
+            claude_max_turns=3,
+        )
+        cmd = ClaudeProcessManager(config)._build_command("Hi", "abc", True)
+
+        assert cmd[1:] == [
+            "--resume",
+            "abc",
+            "-p",
+            "Hi",
+            "--output-format",
+            "stream-json",
+            "--verbose",
+            "--max-turns",
+            "3",
+            "--allowedTools",
+            "Read",
+        ]
+
+    @pytest.mark.parametrize("kill_error", [None, ProcessLookupError])
+    async def test_execute_command_timeout_kills_process(
+        self, process_manager, tmp_path, kill_error
+    ):
+        """Test timed out commands kill the subprocess, even if it just exited."""
+        process = MagicMock()
+        process.kill.side_effect = kill_error
+        process.wait = AsyncMock(return_value=-9)
+
+        async def hanging_output(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        with (
+            patch.object(
+                process_manager, "_start_process", AsyncMock(return_value=process)
+            ),
+            patch.object(
+                process_manager, "_handle_process_output", side_effect=hanging_output
+            ),
+        ):
+            with pytest.raises(ClaudeTimeoutError):
+                await process_manager.execute_command("Hello", tmp_path)
+
+        process.kill.assert_called_once()
+        assert process_manager.get_active_process_count() == 0
+
+    async def test_handle_process_output_skips_untyped_messages(self, process_manager):
+        """Test messages without a type are skipped, not dispatched."""
+        process = make_process(
+            b'{"no_type": true}\n'
+            b'{"type": "assistant", "message": {"content": '
+            b'[{"type": "tool_use", "name": "Read", "input": {}}]}}\n'
+            b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+        )
+        updates = []
+
+        async def callback(update):
+            updates.append(update)
+
+        response = await process_manager._handle_process_output(process, callback)
+
+        assert response.content == "Done"
+        assert response.session_id == "abc"
+        assert [t["name"] for t in response.tools_used] == ["Read"]
+        assert [u.type for u in updates] == ["assistant"]
+
+    async def test_handle_process_output_collects_tools_while_streaming(
+        self, process_manager
+    ):
+        """Test every tool_use block is recorded with its message timestamp."""
+        process = make_process(
+            b'{"type": "assistant", "timestamp": "t1", "message": {"content": ['
+            b'{"type": "tool_use", "name": "Read", "input": {}},'
+            b'{"type": "tool_use", "name": "Grep", "input": {}}]}}\n'
+            b'{"type": "assistant", "timestamp": "t2", "message": {"content": '
+            b'[{"type": "tool_use", "name": "Edit", "input": {}}]}}\n'
+            b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+        )
+
+        response = await process_manager._handle_process_output(process, None)
+
+        assert response.tools_used == [
+            {"name": "Read", "timestamp": "t1"},
+            {"name": "Grep", "timestamp": "t1"},
+            {"name": "Edit", "timestamp": "t2"},
+        ]
+
+    async def test_handle_process_output_reports_stderr(self, process_manager):
+        """Test failed processes surface the tail of stderr."""
+        process_manager.max_stderr_buffer = 16
+        process = make_process(
+            b"", stderr=b"x" * 100 + b"fatal: bad thing", return_code=1
+        )
+
+        with pytest.raises(ClaudeProcessError) as exc_info:
+            await process_manager._handle_process_output(process, None)
+
+        assert str(exc_info.value).endswith(": fatal: bad thing")
+        assert "x" not in str(exc_info.value).split(": ", 1)[1]
+
+    async def test_handle_process_output_drains_stderr_concurrently(
+        self, process_manager
+    ):
+        """Test stderr is consumed while stdout is still open."""
+        process = make_process(b"", stderr=b"warning\n" * 1000)
+        process.stdout = asyncio.StreamReader()
+
+        async def finish_stdout():
+            while not process.stderr.at_eof():
+                await asyncio.sleep(0)
+            process.stdout.feed_data(
+                b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+            )
+            process.stdout.feed_eof()
+
+        feeder = asyncio.create_task(finish_stdout())
+        response = await asyncio.wait_for(
+            process_manager._handle_process_output(process, None), 1
+        )
+        await feeder
+
+        assert response.content == "Done"
+
+    def test_stream_update_helpers(self, process_manager):
+        """Test StreamUpdate helper methods on parsed updates."""
+        update = process_manager._parse_error_message(
+            {"type": "error", "message": "Boom", "code": 500}
+        )
+
+        assert update.is_error()
+        assert update.get_error_message() == "Boom"
+        assert update.get_tool_names() == []
+        assert update.get_progress_percentage() is None
+
+        progress = process_manager._parse_progress_message(
+            {"type": "progress", "status": "Working", "percentage": 40}
+        )
+        assert progress.get_progress_percentage() == 40
+        assert not progress.is_error()
+
+    async def test_handle_process_output_batches_assistant_text(self, process_manager):
+        """Test consecutive assistant text updates reach the callback once."""
+        process = make_process(
+            b'{"type": "assistant", "message": {"content": '
+            b'[{"type": "text", "text": "one"}]}}\n'
+            b'{"type": "assistant", "message": {"content": '
+            b'[{"type": "text", "text": "two"}]}}\n'
+            b'{"type": "assistant", "message": {"content": '
+            b'[{"type": "tool_use", "name": "Read", "input": {}}]}}\n'
+            b'{"type": "assistant", "message": {"content": '
+            b'[{"type": "text", "text": "three"}]}}\n'
+            b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+        )
+        updates = []
+
+        async def callback(update):
+            updates.append(update)
+
+        await process_manager._handle_process_output(process, callback)
+
+        assert [(u.content, u.get_tool_names()) for u in updates] == [
+            ("one\ntwo", []),
+            (None, ["Read"]),
+            ("three", []),
+        ]
+
+    async def test_handle_process_output_delivers_updates_in_order(
+        self, process_manager
+    ):
+        """Test a slow callback never lets a later update overtake it."""
+        process = make_process(
+            b'{"type": "progress", "status": "one"}\n'
+            b'{"type": "progress", "status": "two"}\n'
+            b'{"type": "progress", "status": "three"}\n'
+            b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+        )
+        delays = iter([0.03, 0.01, 0])
+        running = 0
+        updates = []
+
+        async def callback(update):
+            nonlocal running
+            running += 1
+            assert running == 1
+            await asyncio.sleep(next(delays))
+            updates.append(update.content)
+            running -= 1
+
+        await process_manager._handle_process_output(process, callback)
+
+        assert updates == ["one", "two", "three"]
+
+    async def test_assistant_text_batcher_flushes_at_size_limit(self):
+        """Test queued text is flushed early once it reaches the size limit."""
+        emitted = []
+        batcher = _AssistantTextBatcher(emitted.append, interval=60, max_chars=8)
+
+        batcher.add(StreamUpdate(type="assistant", content="abcd"))
+        assert emitted == []
+
+        batcher.add(StreamUpdate(type="assistant", content="efgh"))
+        assert [u.content for u in emitted] == ["abcd\nefgh"]
+
+        batcher.add(StreamUpdate(type="assistant", content="ij"))
+        batcher.flush()
+        assert [u.content for u in emitted] == ["abcd\nefgh", "ij"]
+
+    async def test_handle_process_output_runs_sync_callback(self, process_manager):
+        """Test plain callables are run in an executor instead of awaited."""
+        process = make_process(
+            b'{"type": "system", "subtype": "init", "tools": ["Read"]}\n'
+            b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+        )
+        updates = []
+
+        await process_manager._handle_process_output(process, updates.append)
+
+        assert [u.type for u in updates] == ["system"]
+
+    async def test_handle_process_output_awaits_async_callables(self, process_manager):
+        """Test async callable objects and wrapped coroutines are awaited."""
+        updates = []
+
+        class Recorder:
+            async def __call__(self, update):
+                updates.append(("object", update.type))
+
+        async def record(update):
+            updates.append(("wrapped", update.type))
+
+        def wrapper(update):
+            return record(update)
+
+        for callback in (Recorder(), wrapper):
+            process = make_process(
+                b'{"type": "system", "subtype": "init", "tools": ["Read"]}\n'
+                b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+            )
+            await process_manager._handle_process_output(process, callback)
+
+        assert updates == [("object", "system"), ("wrapped", "system")]
+
+    async def test_read_stream_bounded_splits_lines(self, process_manager):
+        """Test line splitting trims CRLF and skips blank lines."""
+        process_manager.streaming_buffer_size = 4
+        process = make_process(b'{"a": 1}\r\n\n{"b": 2}\n{"c": 3}')
+
+        lines = [
+            line async for line in process_manager._read_stream_bounded(process.stdout)
+        ]
+
+        assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+    async def test_handle_process_output_skips_unhandled_types(self, process_manager):
+        """Test unhandled message types are skipped without being parsed."""
+        process = make_process(
+            b'{"type": "telemetry", "data": not-even-json}\n'
+            b'{"type": "\xff\xfe", "data": 1}\n'
+            b'{"type": "result", "result": "Done", "session_id": "abc"}\n'
+        )
+
+        with patch("src.claude.integration.logger") as mock_logger:
+            response = await process_manager._handle_process_output(process, None)
+
+        assert response.content == "Done"
+        warnings = [c.args[0] for c in mock_logger.warning.call_args_list]
+        assert "Failed to parse JSON line" not in warnings
+
+    async def test_handle_process_output_replaces_invalid_utf8(self, process_manager):
+        """Test a message with invalid UTF-8 is still parsed, not dropped."""
+        process = make_process(
+            b'{"type": "result", "result": "Done \xff", "session_id": "abc"}\n'
+        )
+
+        response = await process_manager._handle_process_output(process, None)
+
+        assert response.content == "Done \ufffd"
+
+    def test_parse_result(self, process_manager):
+        """Test final result parsing into a response."""
+        response = process_manager._parse_result(
+            {
+                "type": "result",
+                "result": "Done",
+                "session_id": "abc",
+                "cost_usd": 0.25,
+                "duration_ms": 1200,
+                "num_turns": 3,
+                "is_error": True,
+                "subtype": "error_max_turns",
+            },
+            [],
+        )
+
+        assert response.content == "Done"
+        assert response.cost == 0.25
+        assert response.num_turns == 3
+        assert response.error_type == "error_max_turns"
+        assert not hasattr(response, "__dict__")
+
+    async def test_kill_all_processes(self, process_manager):
+        """Test tracked processes are killed and the registry emptied."""
+        process = make_process(b"")
+        process.pid = 4242
+        process_manager.active_processes[process.pid] = process
+
+        await process_manager.kill_all_processes()
+
+        process.kill.assert_called_once()
+        assert process_manager.get_active_process_count() == 0
+
+    async def test_handle_process_output_usage_limit(self, process_manager):
+        """Test usage limit errors report the reset time and timezone."""
+        process = make_process(
+            b"",
+            stderr=b"Claude AI usage limit reached. Limit will reset at 5pm (UTC)",
+            return_code=1,
+        )
+
+        with pytest.raises(ClaudeProcessError) as exc_info:
+            await process_manager._handle_process_output(process, None)
+
+        assert "reset at **5pm** (UTC)" in str(exc_info.value)
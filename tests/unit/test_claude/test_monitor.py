@@ -0,0 +1,150 @@
+"""Test Claude tool monitoring."""
+
+from pathlib import Path
+
+import pytest
+
+from src.claude.monitor import ToolMonitor
+from src.config.settings import Settings
+
+
+class TestToolMonitor:
+    """Test tool monitor."""
+
+    @pytest.fixture
+    def config(self, tmp_path):
+        """Create test config."""
+        return Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            claude_allowed_tools=["Read", "Write", "Bash"],
+        )
+
+    @pytest.fixture
+    def monitor(self, config):
+        """Create tool monitor."""
+        return ToolMonitor(config)
+
+    async def test_safe_command_allowed(self, monitor):
+        """Test harmless shell commands pass validation."""
+        valid, error = await monitor.validate_tool_call(
+            "Bash", {"command": "ls -la"}, Path("/tmp"), 123
+        )
+
+        assert valid
+        assert error is None
+        stats = monitor.get_tool_stats()
+        assert stats["by_tool"] == {"Bash": 1}
+        assert stats["total_calls"] == 1
+
+    @pytest.mark.parametrize(
+        "command,pattern",
+        [
+            ("SUDO apt install foo", "sudo"),
+            ("echo hi >> out.txt", ">>"),
+            ("echo hi > out.txt", ">"),
+            ("cat file | grep x", "|"),
+            ("echo $(whoami)", "$("),
+            ("Rm -Rf /", "rm -rf"),
+        ],
+    )
+    async def test_dangerous_command_blocked(self, monitor, command, pattern):
+        """Test dangerous shell commands are rejected."""
+        valid, error = await monitor.validate_tool_call(
+            "Bash", {"command": command}, Path("/tmp"), 123
+        )
+
+        assert not valid
+        assert error == f"Dangerous command pattern detected: {pattern}"
+        violation = monitor.get_security_violations()[-1]
+        assert violation["type"] == "dangerous_command"
+        assert violation["pattern"] == pattern
+
+    async def test_dangerous_command_reports_first_match(self, monitor):
+        """Test the earliest dangerous pattern in the command is reported."""
+        valid, error = await monitor.validate_tool_call(
+            "Bash", {"command": "ls; sudo rm -rf /"}, Path("/tmp"), 123
+        )
+
+        assert not valid
+        assert error == "Dangerous command pattern detected: ;"
+
+    async def test_disallowed_tool_blocked(self, monitor):
+        """Test tools outside the allowed list are rejected."""
+        valid, error = await monitor.validate_tool_call(
+            "WebFetch", {}, Path("/tmp"), 123
+        )
+
+        assert not valid
+        assert error == "Tool not allowed: WebFetch"
+        assert monitor.get_security_violations() == [
+            {
+                "type": "disallowed_tool",
+                "tool_name": "WebFetch",
+                "user_id": 123,
+                "working_directory": "/tmp",
+            }
+        ]
+        assert monitor.get_user_tool_usage(123) == {
+            "user_id": 123,
+            "security_violations": 1,
+            "violation_types": ["disallowed_tool"],
+        }
+
+    async def test_file_tool_requires_path(self, monitor):
+        """Test file tools need a path argument."""
+        valid, error = await monitor.validate_tool_call("Read", {}, Path("/tmp"), 123)
+
+        assert not valid
+        assert error == "File path required"
+
+    def test_is_tool_allowed(self, monitor):
+        """Test allowed-tool lookup without validation."""
+        assert monitor.is_tool_allowed("Read")
+        assert not monitor.is_tool_allowed("WebFetch")
+
+    async def test_explicitly_disallowed_tool_blocked(self, tmp_path):
+        """Test tools in the disallowed list are rejected."""
+        config = Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            claude_allowed_tools=[],
+            claude_disallowed_tools=["Bash"],
+        )
+        monitor = ToolMonitor(config)
+
+        valid, error = await monitor.validate_tool_call(
+            "Bash", {"command": "ls"}, Path("/tmp"), 123
+        )
+
+        assert not valid
+        assert error == "Tool explicitly disallowed: Bash"
+        assert monitor.is_tool_allowed("WebFetch")
+        assert not monitor.is_tool_allowed("Bash")
+
+    async def test_violations_are_bounded(self, tmp_path):
+        """Test old violations are evicted while per-user counts persist."""
+        config = Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            claude_allowed_tools=["Bash"],
+            max_violations_retained=2,
+        )
+        monitor = ToolMonitor(config)
+
+        for tool_name in ["Read", "Write", "Edit"]:
+            await monitor.validate_tool_call(tool_name, {}, Path("/tmp"), 123)
+        await monitor.validate_tool_call(
+            "Bash", {"command": "sudo ls"}, Path("/tmp"), 456
+        )
+
+        violations = monitor.get_security_violations()
+        assert [v["tool_name"] for v in violations] == ["Edit", "Bash"]
+        assert monitor.get_user_tool_usage(123)["security_violations"] == 3
+        assert monitor.get_user_tool_usage(456)["violation_types"] == [
+            "dangerous_command"
+        ]
+        assert monitor.get_user_tool_usage(789)["security_violations"] == 0
@@ -1,7 +1,10 @@
 """Test Claude output parsing."""
 
+from unittest.mock import patch
+
 import pytest
 
+from src.claude.exceptions import ClaudeParsingError
 from src.claude.parser import OutputParser, ResponseFormatter
 
 
@@ -16,11 +19,47 @@ class TestOutputParser:
         assert result["type"] == "result"
         assert result["content"] == "Hello world"
 
+    def test_parse_json_output_bytes(self):
+        """Test raw subprocess bytes parse without decoding first."""
+        result = OutputParser.parse_json_output(b'{"type": "result", "cost": 0.5}')
+
+        assert result == {"type": "result", "cost": 0.5}
+
+    def test_parse_stream_json(self):
+        """Test stream parsing skips blank and invalid lines."""
+        lines = ['{"type": "user"}', "  ", "not json", b'{"type": "result"}\n']
+
+        messages = OutputParser.parse_stream_json(lines)
+
+        assert messages == [{"type": "user"}, {"type": "result"}]
+
+    def test_parse_stream_json_iter(self):
+        """Test lazily parsing a whole NDJSON buffer."""
+        buffer = '{"type": "user", "text": "a\u2028b"}\r\n\nbad\n{"type": "result"}'
+
+        messages = OutputParser.parse_stream_json_iter(buffer)
+
+        assert next(messages) == {"type": "user", "text": "a\u2028b"}
+        assert list(messages) == [{"type": "result"}]
+        assert list(OutputParser.parse_stream_json_iter(b'{"a": 1}\n')) == [{"a": 1}]
+
+    def test_parse_stream_json_iter_is_lazy(self):
+        """Test later lines are not touched until they are requested."""
+        messages = OutputParser.parse_stream_json_iter('{"a": 1}\nbad')
+
+        with patch("src.claude.parser.logger") as mock_logger:
+            assert next(messages) == {"a": 1}
+            mock_logger.warning.assert_not_called()
+            assert list(messages) == []
+            mock_logger.warning.assert_called_once()
+
     def test_parse_invalid_json(self):
         """Test invalid JSON handling."""
-        with pytest.raises(Exception):  # ClaudeParsingError
+        with pytest.raises(ClaudeParsingError) as exc_info:
             OutputParser.parse_json_output("invalid json")
 
+        assert exc_info.value.__cause__ is not None
+
     def test_extract_code_blocks(self):
         """Test code block extraction."""
         content = """
@@ -53,6 +92,14 @@ Some plain text
         assert "console.log" in blocks[1]["code"]
         assert blocks[2]["language"] == "text"
 
+    def test_extract_code_blocks_fence_edge_cases(self):
+        """Test fences that aren't valid openings and unterminated blocks."""
+        content = "````py\nx = 1\n``` then ```not a tag\nrest\n```sh\nls"
+
+        blocks = OutputParser.extract_code_blocks(content)
+
+        assert blocks == [{"language": "py", "code": "x = 1"}]
+
     def test_extract_file_operations(self):
         """Test file operation extraction."""
         messages = [
@@ -180,6 +227,11 @@ Some plain text
                             "name": "Write",
                             "input": {"file_path": "test.py"},
                         },
+                        {
+                            "type": "tool_use",
+                            "name": "Bash",
+                            "input": {"command": "python test.py"},
+                        },
                     ]
                 },
             },
@@ -191,10 +243,46 @@ Some plain text
         assert summary["total_messages"] == 3
         assert summary["user_messages"] == 1
         assert summary["assistant_messages"] == 1
-        assert summary["tool_calls"] == 1
+        assert summary["tool_calls"] == 2
         assert summary["tool_results"] == 1
         assert summary["code_blocks"] == 1
         assert summary["file_operations"] == 1
+        assert summary["shell_commands"] == 1
+
+    def test_summarize_session_matches_extractors(self):
+        """Test single-pass summary counts agree with the individual extractors."""
+        tool_uses = [
+            {"type": "tool_use", "name": name, "input": {"path": "a.py"}}
+            for name in ["Read", "Bash", "Edit", "Grep", "Bash", "MultiEdit"]
+        ]
+        messages = [
+            {"type": "assistant", "message": {"content": tool_uses[:3]}},
+            {"type": "tool_result", "result": {"content": "x", "is_error": True}},
+            {"type": "assistant", "message": {"content": tool_uses[3:]}},
+        ]
+
+        summary = OutputParser.summarize_session(messages)
+
+        assert summary["tool_calls"] == 6
+        assert summary["file_operations"] == len(
+            OutputParser.extract_file_operations(messages)
+        )
+        assert summary["shell_commands"] == len(
+            OutputParser.extract_shell_commands(messages)
+        )
+        assert summary["tool_results"] == len(
+            OutputParser.extract_tool_results(messages)
+        )
+
+    def test_summarize_empty_session(self):
+        """Test an empty session summarizes to zero counts."""
+        summary = OutputParser.summarize_session([])
+
+        assert set(summary.values()) == {0}
+        assert "shell_commands" in summary
+
+        summary["errors"] = 1
+        assert OutputParser.summarize_session([])["errors"] == 0
 
 
 class TestResponseFormatter:
@@ -221,6 +309,22 @@ class TestResponseFormatter:
         assert all(len(msg) <= 100 for msg in messages)
         assert "".join(messages) == content
 
+    def test_split_long_text_chunks(self):
+        """Test long text is cut into full-size chunks plus a remainder."""
+        formatter = ResponseFormatter(max_message_length=4)
+
+        assert formatter._split_long_text("abcdefghij") == ["abcd", "efgh", "ij"]
+        assert formatter._split_long_text("abcd") == ["abcd"]
+        assert formatter._split_long_text("") == []
+
+    def test_split_preserving_code_blocks_packs_lines(self):
+        """Test whole lines are packed into parts up to the limit."""
+        formatter = ResponseFormatter(max_message_length=8)
+
+        parts = formatter._split_preserving_code_blocks("one\ntwo\nthree\n\n")
+
+        assert parts == ["one\ntwo", "three"]
+
     def test_format_with_code_blocks(self):
         """Test formatting preserves code blocks."""
         formatter = ResponseFormatter(max_message_length=200)
@@ -6,35 +6,60 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from claude_code_sdk import ClaudeCodeOptions
+from claude_code_sdk.types import AssistantMessage, ResultMessage
 
 from src.claude.sdk_integration import ClaudeResponse, ClaudeSDKManager, StreamUpdate
 from src.config.settings import Settings
 
+_SUCCESS_MESSAGES = (
+    AssistantMessage(content="Test response"),
+    ResultMessage(
+        subtype="success",
+        duration_ms=1000,
+        duration_api_ms=800,
+        is_error=False,
+        num_turns=1,
+        session_id="test-session",
+        total_cost_usd=0.05,
+        result="Success",
+    ),
+)
+
+
+def make_query_mock(messages=_SUCCESS_MESSAGES):
+    """Build a stand-in for the SDK query that yields the given messages."""
+
+    async def mock_query(prompt, options):
+        for message in messages:
+            yield message
+
+    return mock_query
+
+
+@pytest.fixture(scope="module")
+def config(tmp_path_factory):
+    """Create test config without API key, shared by the module."""
+    return Settings(
+        telegram_bot_token="test:token",
+        telegram_bot_username="testbot",
+        approved_directory=tmp_path_factory.mktemp("projects"),
+        use_sdk=True,
+        claude_timeout_seconds=2,  # Short timeout for testing
+    )
+
 
 class TestClaudeSDKManager:
     """Test Claude SDK manager."""
 
-    @pytest.fixture
-    def config(self, tmp_path):
-        """Create test config without API key."""
-        return Settings(
-            telegram_bot_token="test:token",
-            telegram_bot_username="testbot",
-            approved_directory=tmp_path,
-            use_sdk=True,
-            claude_timeout_seconds=2,  # Short timeout for testing
-        )
-
     @pytest.fixture
     def sdk_manager(self, config):
         """Create SDK manager."""
         return ClaudeSDKManager(config)
 
-    async def test_sdk_manager_initialization_with_api_key(self, tmp_path):
+    async def test_sdk_manager_initialization_with_api_key(self, tmp_path, monkeypatch):
         """Test SDK manager initialization with API key."""
-        from src.config.settings import Settings
-
-        # Test with API key provided
+        # The manager exports the key; monkeypatch restores the variable after
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "original-key")
         config_with_key = Settings(
             telegram_bot_token="test:token",
             telegram_bot_username="testbot",
@@ -44,63 +69,36 @@ class TestClaudeSDKManager:
             claude_timeout_seconds=2,
         )
 
-        # Store original env var
-        original_api_key = os.environ.get("ANTHROPIC_API_KEY")
-
-        try:
-            manager = ClaudeSDKManager(config_with_key)
-
-            # Check that API key was set in environment
-            assert os.environ.get("ANTHROPIC_API_KEY") == "test-api-key"
-            assert manager.active_sessions == {}
+        manager = ClaudeSDKManager(config_with_key)
 
-        finally:
-            # Restore original env var
-            if original_api_key:
-                os.environ["ANTHROPIC_API_KEY"] = original_api_key
-            elif "ANTHROPIC_API_KEY" in os.environ:
-                del os.environ["ANTHROPIC_API_KEY"]
+        # Check that API key was set in environment
+        assert os.environ.get("ANTHROPIC_API_KEY") == "test-api-key"
+        assert manager.active_sessions == {}
 
-    async def test_sdk_manager_initialization_without_api_key(self, config):
+    async def test_sdk_manager_initialization_without_api_key(
+        self, tmp_path, monkeypatch
+    ):
         """Test SDK manager initialization without API key (uses CLI auth)."""
-        # Store original env var
-        original_api_key = os.environ.get("ANTHROPIC_API_KEY")
-
-        try:
-            # Remove any existing API key
-            if "ANTHROPIC_API_KEY" in os.environ:
-                del os.environ["ANTHROPIC_API_KEY"]
-
-            manager = ClaudeSDKManager(config)
+        # Settings reads the key from the environment, so clear it first
+        monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+        config = Settings(
+            telegram_bot_token="test:token",
+            telegram_bot_username="testbot",
+            approved_directory=tmp_path,
+            use_sdk=True,
+            claude_timeout_seconds=2,
+        )
 
-            # Check that no API key was set (should use CLI auth)
-            assert config.anthropic_api_key_str is None
-            assert manager.active_sessions == {}
+        manager = ClaudeSDKManager(config)
 
-        finally:
-            # Restore original env var
-            if original_api_key:
-                os.environ["ANTHROPIC_API_KEY"] = original_api_key
+        # Check that no API key was set (should use CLI auth)
+        assert config.anthropic_api_key_str is None
+        assert "ANTHROPIC_API_KEY" not in os.environ
+        assert manager.active_sessions == {}
 
     async def test_execute_command_success(self, sdk_manager):
         """Test successful command execution."""
-        from claude_code_sdk.types import AssistantMessage, ResultMessage
-
-        # Mock the claude-code-sdk query function
-        async def mock_query(prompt, options):
-            yield AssistantMessage(content="Test response")
-            yield ResultMessage(
-                subtype="success",
-                duration_ms=1000,
-                duration_api_ms=800,
-                is_error=False,
-                num_turns=1,
-                session_id="test-session",
-                total_cost_usd=0.05,
-                result="Success",
-            )
-
-        with patch("src.claude.sdk_integration.query", side_effect=mock_query):
+        with patch("src.claude.sdk_integration.query", side_effect=make_query_mock()):
             response = await sdk_manager.execute_command(
                 prompt="Test prompt",
                 working_directory=Path("/test"),
@@ -113,31 +111,16 @@ class TestClaudeSDKManager:
         assert response.duration_ms >= 0  # Can be 0 in tests
         assert not response.is_error
         assert response.cost == 0.05
+        assert response.num_turns == 1
 
     async def test_execute_command_with_streaming(self, sdk_manager):
         """Test command execution with streaming callback."""
-        from claude_code_sdk.types import AssistantMessage, ResultMessage
-
         stream_updates = []
 
         async def stream_callback(update: StreamUpdate):
             stream_updates.append(update)
 
-        # Mock the claude-code-sdk query function
-        async def mock_query(prompt, options):
-            yield AssistantMessage(content="Test response")
-            yield ResultMessage(
-                subtype="success",
-                duration_ms=1000,
-                duration_api_ms=800,
-                is_error=False,
-                num_turns=1,
-                session_id="test-session",
-                total_cost_usd=0.05,
-                result="Success",
-            )
-
-        with patch("src.claude.sdk_integration.query", side_effect=mock_query):
+        with patch("src.claude.sdk_integration.query", side_effect=make_query_mock()):
             response = await sdk_manager.execute_command(
                 prompt="Test prompt",
                 working_directory=Path("/test"),
@@ -148,13 +131,36 @@ class TestClaudeSDKManager:
         assert len(stream_updates) > 0
         assert any(update.type == "assistant" for update in stream_updates)
 
-    async def test_execute_command_timeout(self, sdk_manager):
+    async def test_stream_handles_message_subclasses(self, sdk_manager):
+        """Test subclasses of SDK messages reach their base class handler."""
+
+        class CustomAssistantMessage(AssistantMessage):
+            pass
+
+        updates = []
+
+        async def stream_callback(update: StreamUpdate):
+            updates.append(update)
+
+        await sdk_manager._handle_stream_message(
+            CustomAssistantMessage(content="Subclassed"), stream_callback
+        )
+        await sdk_manager._handle_stream_message(_SUCCESS_MESSAGES[1], stream_callback)
+
+        assert [(u.type, u.content) for u in updates] == [("assistant", "Subclassed")]
+
+    async def test_execute_command_timeout(self, config):
         """Test command execution timeout."""
         import asyncio
 
+        # Copy rather than mutate the module-shared config
+        sdk_manager = ClaudeSDKManager(
+            config.model_copy(update={"claude_timeout_seconds": 0.05})
+        )
+
         # Mock a hanging operation - return async generator that never yields
         async def mock_hanging_query(prompt, options):
-            await asyncio.sleep(5)  # This should timeout (config has 2s timeout)
+            await asyncio.sleep(1)  # Far beyond the 50ms timeout
             yield  # This will never be reached
 
         from src.claude.exceptions import ClaudeTimeoutError
@@ -168,8 +174,6 @@ class TestClaudeSDKManager:
 
     async def test_session_management(self, sdk_manager):
         """Test session management."""
-        from claude_code_sdk.types import AssistantMessage
-
         session_id = "test-session"
         messages = [AssistantMessage(content="test")]
 
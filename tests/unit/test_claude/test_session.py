@@ -2,6 +2,7 @@
 
 from datetime import datetime, timedelta
 from pathlib import Path
+from unittest.mock import AsyncMock
 
 import pytest
 
@@ -9,19 +10,30 @@ from src.claude.sdk_integration import ClaudeResponse
 from src.claude.session import ClaudeSession, InMemorySessionStorage, SessionManager
 from src.config.settings import Settings
 
+NOW = datetime.utcnow()
+
+
+def make_session(
+    user_id: int = 123, path: str = "/test/path", **overrides
+) -> ClaudeSession:
+    """Build a session with fixed timestamps, overriding any field."""
+    fields = {
+        "session_id": "test-session",
+        "user_id": user_id,
+        "project_path": Path(path),
+        "created_at": NOW,
+        "last_used": NOW,
+    }
+    fields.update(overrides)
+    return ClaudeSession(**fields)
+
 
 class TestClaudeSession:
     """Test ClaudeSession class."""
 
     def test_session_creation(self):
         """Test session creation."""
-        session = ClaudeSession(
-            session_id="test-session",
-            user_id=123,
-            project_path=Path("/test/path"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
+        session = make_session()
 
         assert session.session_id == "test-session"
         assert session.user_id == 123
@@ -29,34 +41,24 @@ class TestClaudeSession:
         assert session.total_cost == 0.0
         assert session.total_turns == 0
         assert session.message_count == 0
-        assert session.tools_used == []
+        assert session.tools_used == set()
+        assert not hasattr(session, "__dict__")
 
     def test_session_expiry(self):
         """Test session expiry logic."""
-        now = datetime.utcnow()
-        old_time = now - timedelta(hours=25)
-
-        session = ClaudeSession(
-            session_id="test-session",
-            user_id=123,
-            project_path=Path("/test/path"),
-            created_at=old_time,
-            last_used=old_time,
-        )
+        old_time = NOW - timedelta(hours=25)
+        session = make_session(created_at=old_time, last_used=old_time)
 
         # Should be expired after 24 hours
         assert session.is_expired(24) is True
         assert session.is_expired(48) is False
 
+        # A caller-supplied now is used instead of the current time
+        assert session.is_expired(24, now=old_time + timedelta(hours=23)) is False
+
     def test_update_usage(self):
         """Test usage update."""
-        session = ClaudeSession(
-            session_id="test-session",
-            user_id=123,
-            project_path=Path("/test/path"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
+        session = make_session()
 
         response = ClaudeResponse(
             content="Test response",
@@ -72,21 +74,15 @@ class TestClaudeSession:
         assert session.total_cost == 0.05
         assert session.total_turns == 2
         assert session.message_count == 1
-        assert "Read" in session.tools_used
-        assert "Write" in session.tools_used
+        assert session.tools_used == {"Read", "Write"}
 
     def test_to_dict_and_from_dict(self):
         """Test serialization/deserialization."""
-        original = ClaudeSession(
-            session_id="test-session",
-            user_id=123,
-            project_path=Path("/test/path"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
+        original = make_session(
             total_cost=0.05,
             total_turns=2,
             message_count=1,
-            tools_used=["Read", "Write"],
+            tools_used={"Read", "Write"},
         )
 
         # Convert to dict and back
@@ -100,6 +96,7 @@ class TestClaudeSession:
         assert restored.total_turns == original.total_turns
         assert restored.message_count == original.message_count
         assert restored.tools_used == original.tools_used
+        assert data["tools_used"] == ["Read", "Write"]
 
 
 class TestInMemorySessionStorage:
@@ -113,13 +110,7 @@ class TestInMemorySessionStorage:
     @pytest.fixture
     def sample_session(self):
         """Create sample session."""
-        return ClaudeSession(
-            session_id="test-session",
-            user_id=123,
-            project_path=Path("/test/path"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
+        return make_session()
 
     async def test_save_and_load_session(self, storage, sample_session):
         """Test saving and loading session."""
@@ -147,60 +138,58 @@ class TestInMemorySessionStorage:
         result = await storage.load_session("test-session")
         assert result is None
 
-    async def test_get_user_sessions(self, storage):
+    @pytest.mark.parametrize(
+        "user_id,expected_ids",
+        [
+            (123, {"session1", "session2"}),
+            (456, {"session3"}),
+            (789, set()),
+        ],
+    )
+    async def test_get_user_sessions(self, storage, user_id, expected_ids):
         """Test getting user sessions."""
         # Create sessions for different users
-        session1 = ClaudeSession(
-            session_id="session1",
-            user_id=123,
-            project_path=Path("/test/path1"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
-        session2 = ClaudeSession(
-            session_id="session2",
-            user_id=123,
-            project_path=Path("/test/path2"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
-        session3 = ClaudeSession(
-            session_id="session3",
-            user_id=456,
-            project_path=Path("/test/path3"),
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
+        for session_id, owner, path in [
+            ("session1", 123, "/test/path1"),
+            ("session2", 123, "/test/path2"),
+            ("session3", 456, "/test/path3"),
+        ]:
+            await storage.save_session(make_session(owner, path, session_id=session_id))
+
+        user_sessions = await storage.get_user_sessions(user_id)
+        assert {s.session_id for s in user_sessions} == expected_ids
+        assert all(s.user_id == user_id for s in user_sessions)
+
+    async def test_user_sessions_follow_saves_and_deletes(
+        self, storage, sample_session
+    ):
+        """Test the per-user lookup reflects re-saves and deletions."""
+        await storage.save_session(sample_session)
+        await storage.save_session(sample_session)
+        assert await storage.get_user_sessions(sample_session.user_id) == [
+            sample_session
+        ]
 
-        await storage.save_session(session1)
-        await storage.save_session(session2)
-        await storage.save_session(session3)
+        await storage.delete_session(sample_session.session_id)
+        assert await storage.get_user_sessions(sample_session.user_id) == []
+        assert await storage.get_all_sessions() == []
 
-        # Get sessions for user 123
-        user_sessions = await storage.get_user_sessions(123)
-        assert len(user_sessions) == 2
-        assert all(s.user_id == 123 for s in user_sessions)
 
-        # Get sessions for user 456
-        user_sessions = await storage.get_user_sessions(456)
-        assert len(user_sessions) == 1
-        assert user_sessions[0].user_id == 456
+@pytest.fixture(scope="module")
+def config(tmp_path_factory):
+    """Create test config, shared by the module."""
+    return Settings(
+        telegram_bot_token="test:token",
+        telegram_bot_username="testbot",
+        approved_directory=tmp_path_factory.mktemp("projects"),
+        session_timeout_hours=24,
+        max_sessions_per_user=2,
+    )
 
 
 class TestSessionManager:
     """Test session manager."""
 
-    @pytest.fixture
-    def config(self, tmp_path):
-        """Create test config."""
-        return Settings(
-            telegram_bot_token="test:token",
-            telegram_bot_username="testbot",
-            approved_directory=tmp_path,
-            session_timeout_hours=24,
-            max_sessions_per_user=2,
-        )
-
     @pytest.fixture
     def storage(self):
         """Create storage instance."""
@@ -263,3 +252,23 @@ class TestSessionManager:
             session1.session_id
         )
         assert loaded_session1 is None
+
+    async def test_loaded_session_served_from_memory(self, config, storage):
+        """Test storage is read once per session, even after expiry."""
+        await storage.save_session(make_session())
+        storage.load_session = AsyncMock(wraps=storage.load_session)
+        session_manager = SessionManager(config, storage)
+
+        for _ in range(2):
+            session = await session_manager.get_or_create_session(
+                user_id=123, project_path=Path("/test/path"), session_id="test-session"
+            )
+            assert session.session_id == "test-session"
+        assert storage.load_session.await_count == 1
+
+        session.last_used = NOW - timedelta(hours=25)
+        replacement = await session_manager.get_or_create_session(
+            user_id=123, project_path=Path("/test/path"), session_id="test-session"
+        )
+        assert replacement.session_id != "test-session"
+        assert storage.load_session.await_count == 1
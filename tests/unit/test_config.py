@@ -1,17 +1,37 @@
 """Test configuration loading and validation."""
 
-import os
-import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
-from pydantic import ValidationError
-
-from src.config import Settings, create_test_config, load_config
+from pydantic import SecretStr, ValidationError
+
+from src.config import (
+    Settings,
+    create_test_config,
+    invalidate_config_cache,
+    load_config,
+)
 from src.config.features import FeatureFlags
 from src.exceptions import ConfigurationError
 
 
+@pytest.fixture(scope="module")
+def approved_dir(tmp_path_factory):
+    """Approved directory shared by tests that never modify it."""
+    return tmp_path_factory.mktemp("approved")
+
+
+@pytest.fixture(scope="module")
+def base_settings(approved_dir):
+    """Valid settings shared by tests that derive variants via model_copy."""
+    return Settings(
+        telegram_bot_token="test_token",
+        telegram_bot_username="test_bot",
+        approved_directory=str(approved_dir),
+    )
+
+
 def test_settings_validation_required_fields(monkeypatch):
     """Test that missing required fields raise validation errors."""
     # Clear any environment variables that might provide defaults
@@ -45,205 +65,176 @@ def test_settings_with_valid_data(tmp_path):
     assert settings.approved_directory == test_dir
 
 
-def test_allowed_users_parsing():
+def test_allowed_users_parsing(approved_dir):
     """Test parsing of comma-separated user IDs."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        settings = Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=tmp_dir,
-            allowed_users="123,456,789",
-        )
-
-        assert settings.allowed_users == [123, 456, 789]
-
-
-def test_allowed_users_parsing_with_spaces():
-    """Test parsing with spaces around user IDs."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        settings = Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=tmp_dir,
-            allowed_users="123, 456 , 789",
-        )
-
-        assert settings.allowed_users == [123, 456, 789]
-
+    tmp_dir = str(approved_dir)
+    settings = Settings(
+        telegram_bot_token="test_token",
+        telegram_bot_username="test_bot",
+        approved_directory=tmp_dir,
+        allowed_users="123,456,789",
+    )
 
-def test_approved_directory_validation_nonexistent():
-    """Test validation fails for non-existent directory."""
-    with pytest.raises(ValidationError) as exc_info:
-        Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory="/nonexistent/directory",
-        )
+    assert settings.allowed_users == [123, 456, 789]
 
-    assert "does not exist" in str(exc_info.value)
+    # The parse is memoized, but each instance still owns its list
+    other = Settings(
+        telegram_bot_token="test_token",
+        telegram_bot_username="test_bot",
+        approved_directory=tmp_dir,
+        allowed_users="123,456,789",
+    )
+    assert other.allowed_users == settings.allowed_users
+    assert other.allowed_users is not settings.allowed_users
 
 
-def test_approved_directory_validation_not_directory(tmp_path):
-    """Test validation fails when path is not a directory."""
-    test_file = tmp_path / "not_a_dir.txt"
-    test_file.write_text("test")
+def test_allowed_users_parsing_with_spaces(approved_dir):
+    """Test parsing with spaces around user IDs."""
+    tmp_dir = str(approved_dir)
+    settings = Settings(
+        telegram_bot_token="test_token",
+        telegram_bot_username="test_bot",
+        approved_directory=tmp_dir,
+        allowed_users="123, 456 , 789",
+    )
 
-    with pytest.raises(ValidationError) as exc_info:
-        Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=str(test_file),
-        )
+    assert settings.allowed_users == [123, 456, 789]
 
-    assert "not a directory" in str(exc_info.value)
-
-
-def test_auth_token_validation():
-    """Test auth token secret validation."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        # Should fail when token auth enabled but no secret
-        with pytest.raises(ValidationError) as exc_info:
-            Settings(
-                telegram_bot_token="test_token",
-                telegram_bot_username="test_bot",
-                approved_directory=tmp_dir,
-                enable_token_auth=True,
-            )
-
-        assert "auth_token_secret required" in str(exc_info.value)
-
-        # Should succeed when both enabled and secret provided
-        settings = Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=tmp_dir,
-            enable_token_auth=True,
-            auth_token_secret="secret123",
-        )
 
-        assert settings.enable_token_auth is True
-        assert settings.auth_secret_str == "secret123"
+def _fill_paths(values, tmp_path):
+    """Substitute {tmp} in string values with the test's tmp_path."""
+    return {
+        key: value.format(tmp=tmp_path) if isinstance(value, str) else value
+        for key, value in values.items()
+    }
 
 
-def test_mcp_config_validation(tmp_path, monkeypatch):
-    """Test MCP configuration validation."""
-    test_dir = tmp_path / "projects"
-    test_dir.mkdir()
-
+@pytest.fixture
+def validation_paths(tmp_path, monkeypatch):
+    """Provide a plain file and an MCP config file under tmp_path."""
     # Clear any MCP-related environment variables
     monkeypatch.delenv("ENABLE_MCP", raising=False)
     monkeypatch.delenv("MCP_CONFIG_PATH", raising=False)
 
-    # Should fail when MCP enabled but no config path
-    with pytest.raises(ValidationError) as exc_info:
-        Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=str(test_dir),
-            enable_mcp=True,
-            mcp_config_path=None,
-        )
-
-    assert "mcp_config_path required" in str(exc_info.value)
+    (tmp_path / "not_a_dir.txt").write_text("test")
+    (tmp_path / "mcp_config.json").write_text('{"test": true}')
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "overrides,expected_error",
+    [
+        pytest.param(
+            {"approved_directory": "/nonexistent/directory"},
+            "does not exist",
+            id="approved-directory-missing",
+        ),
+        pytest.param(
+            {"approved_directory": "{tmp}/not_a_dir.txt"},
+            "not a directory",
+            id="approved-directory-is-file",
+        ),
+        pytest.param(
+            {"enable_token_auth": True},
+            "auth_token_secret required",
+            id="token-auth-without-secret",
+        ),
+        pytest.param(
+            {"enable_mcp": True, "mcp_config_path": None},
+            "mcp_config_path required",
+            id="mcp-without-config",
+        ),
+        pytest.param(
+            {"enable_mcp": True, "mcp_config_path": "/nonexistent/config.json"},
+            "does not exist",
+            id="mcp-config-missing",
+        ),
+        pytest.param({"log_level": "INVALID"}, "must be one of", id="log-level"),
+    ],
+)
+def test_settings_validation_errors(
+    approved_dir, validation_paths, overrides, expected_error
+):
+    """Test invalid settings are rejected with a descriptive error."""
+    kwargs = {
+        "telegram_bot_token": "test_token",
+        "telegram_bot_username": "test_bot",
+        "approved_directory": str(approved_dir),
+        **_fill_paths(overrides, validation_paths),
+    }
 
-    # Should fail when config file doesn't exist
     with pytest.raises(ValidationError) as exc_info:
-        Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=str(test_dir),
-            enable_mcp=True,
-            mcp_config_path="/nonexistent/config.json",
-        )
-
-    assert "does not exist" in str(exc_info.value)
-
-    # Should succeed when config file exists
-    config_file = tmp_path / "mcp_config.json"
-    config_file.write_text('{"test": true}')
-
+        Settings(**kwargs)
+
+    assert expected_error in str(exc_info.value)
+
+
+@pytest.mark.parametrize(
+    "overrides,expected",
+    [
+        pytest.param(
+            {"enable_token_auth": True, "auth_token_secret": "secret123"},
+            {"enable_token_auth": True, "auth_secret_str": "secret123"},
+            id="token-auth-with-secret",
+        ),
+        pytest.param(
+            {"enable_mcp": True, "mcp_config_path": "{tmp}/mcp_config.json"},
+            {"enable_mcp": True, "mcp_config_path": "{tmp}/mcp_config.json"},
+            id="mcp-with-config",
+        ),
+        # Log level should be converted to uppercase
+        pytest.param({"log_level": "debug"}, {"log_level": "DEBUG"}, id="log-level"),
+    ],
+)
+def test_settings_validation_accepts(
+    approved_dir, validation_paths, overrides, expected
+):
+    """Test valid settings pass validation and are normalized."""
     settings = Settings(
         telegram_bot_token="test_token",
         telegram_bot_username="test_bot",
-        approved_directory=str(test_dir),
-        enable_mcp=True,
-        mcp_config_path=str(config_file),
+        approved_directory=str(approved_dir),
+        **_fill_paths(overrides, validation_paths),
     )
 
-    assert settings.enable_mcp is True
-    assert settings.mcp_config_path == config_file
-
-
-def test_log_level_validation():
-    """Test log level validation."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        # Should fail with invalid log level
-        with pytest.raises(ValidationError) as exc_info:
-            Settings(
-                telegram_bot_token="test_token",
-                telegram_bot_username="test_bot",
-                approved_directory=tmp_dir,
-                log_level="INVALID",
-            )
-
-        assert "must be one of" in str(exc_info.value)
-
-        # Should succeed with valid log level
-        settings = Settings(
-            telegram_bot_token="test_token",
-            telegram_bot_username="test_bot",
-            approved_directory=tmp_dir,
-            log_level="debug",  # Should be converted to uppercase
-        )
-
-        assert settings.log_level == "DEBUG"
+    for attr, value in _fill_paths(expected, validation_paths).items():
+        actual = getattr(settings, attr)
+        assert (str(actual) if isinstance(actual, Path) else actual) == value
 
 
-def test_computed_properties(tmp_path):
+def test_computed_properties(base_settings):
     """Test computed properties."""
-    test_dir = tmp_path / "projects"
-    test_dir.mkdir()
-
     # Test production mode detection
-    dev_settings = Settings(
-        telegram_bot_token="test_token",
-        telegram_bot_username="test_bot",
-        approved_directory=str(test_dir),
-        debug=True,
-    )
+    dev_settings = base_settings.model_copy(update={"debug": True})
     assert dev_settings.is_production is False
 
-    prod_settings = Settings(
-        telegram_bot_token="test_token",
-        telegram_bot_username="test_bot",
-        approved_directory=str(test_dir),
-        debug=False,
-        development_mode=False,
+    prod_settings = base_settings.model_copy(
+        update={"debug": False, "development_mode": False}
     )
     assert prod_settings.is_production is True
 
     # Test database path extraction
-    sqlite_settings = Settings(
-        telegram_bot_token="test_token",
-        telegram_bot_username="test_bot",
-        approved_directory=str(test_dir),
-        database_url="sqlite:///data/bot.db",
+    sqlite_settings = base_settings.model_copy(
+        update={"database_url": "sqlite:///data/bot.db"}
     )
     assert sqlite_settings.database_path == Path("data/bot.db").resolve()
 
 
-def test_feature_flags():
+def test_feature_flags(base_settings, tmp_path):
     """Test feature flag system."""
-    # Create test MCP config file before creating settings
-    Path("/tmp/test.json").write_text('{"test": true}')
-
-    settings = create_test_config(
-        enable_mcp=True,
-        mcp_config_path="/tmp/test.json",
-        enable_git_integration=True,
-        enable_file_uploads=False,
-        enable_token_auth=True,
-        auth_token_secret="secret",
+    mcp_config = tmp_path / "mcp.json"
+    mcp_config.write_text('{"test": true}')
+
+    # Validation is covered above; model_copy only swaps in the flag values
+    settings = base_settings.model_copy(
+        update={
+            "enable_mcp": True,
+            "mcp_config_path": mcp_config,
+            "enable_git_integration": True,
+            "enable_file_uploads": False,
+            "enable_token_auth": True,
+            "auth_token_secret": SecretStr("secret"),
+        }
     )
 
     features = FeatureFlags(settings)
@@ -263,37 +254,23 @@ def test_feature_flags():
     assert features.is_feature_enabled("git") is True
     assert features.is_feature_enabled("nonexistent") is False
 
-    # Cleanup test file
-    Path("/tmp/test.json").unlink(missing_ok=True)
 
-
-def test_environment_loading():
+def test_environment_loading(tmp_path, monkeypatch):
     """Test environment-specific configuration loading."""
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "test_token")
+    monkeypatch.setenv("TELEGRAM_BOT_USERNAME", "test_bot")
+    monkeypatch.setenv("APPROVED_DIRECTORY", str(tmp_path))
+
     # Test development environment
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        os.environ["TELEGRAM_BOT_TOKEN"] = "test_token"
-        os.environ["TELEGRAM_BOT_USERNAME"] = "test_bot"
-        os.environ["APPROVED_DIRECTORY"] = tmp_dir
-
-        try:
-            config = load_config(env="development")
-            assert config.debug is True
-            assert config.development_mode is True
-            assert config.log_level == "DEBUG"
-
-            config = load_config(env="production")
-            assert config.debug is False
-            assert config.development_mode is False
-            assert config.log_level == "INFO"
-
-        finally:
-            # Clean up environment
-            for key in [
-                "TELEGRAM_BOT_TOKEN",
-                "TELEGRAM_BOT_USERNAME",
-                "APPROVED_DIRECTORY",
-            ]:
-                os.environ.pop(key, None)
+    config = load_config(env="development")
+    assert config.debug is True
+    assert config.development_mode is True
+    assert config.log_level == "DEBUG"
+
+    config = load_config(env="production")
+    assert config.debug is False
+    assert config.development_mode is False
+    assert config.log_level == "INFO"
 
 
 def test_create_test_config():
@@ -316,21 +293,52 @@ def test_create_test_config():
     assert config.claude_max_turns == 5
 
 
-def test_configuration_error_handling():
+def test_configuration_error_handling(tmp_path, monkeypatch):
     """Test configuration error handling."""
     # Test with invalid directory permissions (simulate by using a file)
-    with tempfile.NamedTemporaryFile() as tmp_file:
-        os.environ["TELEGRAM_BOT_TOKEN"] = "test_token"
-        os.environ["TELEGRAM_BOT_USERNAME"] = "test_bot"
-        os.environ["APPROVED_DIRECTORY"] = tmp_file.name  # File instead of directory
-
-        try:
-            with pytest.raises(ConfigurationError):
-                load_config()
-        finally:
-            for key in [
-                "TELEGRAM_BOT_TOKEN",
-                "TELEGRAM_BOT_USERNAME",
-                "APPROVED_DIRECTORY",
-            ]:
-                os.environ.pop(key, None)
+    not_a_directory = tmp_path / "file.txt"
+    not_a_directory.touch()
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "test_token")
+    monkeypatch.setenv("TELEGRAM_BOT_USERNAME", "test_bot")
+    monkeypatch.setenv("APPROVED_DIRECTORY", str(not_a_directory))
+
+    with pytest.raises(ConfigurationError):
+        load_config()
+
+
+def test_load_config_cache(tmp_path, monkeypatch):
+    """Test repeated loads reuse settings until the inputs change."""
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "test_token")
+    monkeypatch.setenv("TELEGRAM_BOT_USERNAME", "test_bot")
+    monkeypatch.setenv("APPROVED_DIRECTORY", str(tmp_path))
+    config_file = tmp_path / "bot.env"
+    invalidate_config_cache()
+
+    with patch("src.config.loader.Settings", wraps=Settings) as settings_cls:
+        first = load_config(env="testing", config_file=config_file)
+        built = settings_cls.call_count
+        second = load_config(env="testing", config_file=config_file)
+        assert settings_cls.call_count == built
+        assert second == first
+        assert second is not first
+
+        # Mutable fields are not shared with the cache entry
+        first.claude_allowed_tools.append("Injected")
+        assert "Injected" not in second.claude_allowed_tools
+        assert (
+            "Injected"
+            not in load_config(
+                env="testing", config_file=config_file
+            ).claude_allowed_tools
+        )
+
+        monkeypatch.setenv("TELEGRAM_BOT_USERNAME", "other_bot")
+        third = load_config(env="testing", config_file=config_file)
+        assert settings_cls.call_count == 2 * built
+        assert third.telegram_bot_username == "other_bot"
+
+        invalidate_config_cache()
+        load_config(env="testing", config_file=config_file)
+        assert settings_cls.call_count == 3 * built
+
+    invalidate_config_cache()
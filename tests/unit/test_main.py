@@ -0,0 +1,23 @@
+"""Test application entry point helpers."""
+
+import json
+import logging
+
+import structlog
+
+from src.main import setup_logging
+
+
+def test_json_logging_accepts_any_field(caplog):
+    """Test production logging serializes fields orjson rejects by default."""
+    caplog.set_level(logging.INFO)
+    setup_logging(debug=False)
+    try:
+        structlog.get_logger("test").info("event", d={1: 2}, big=2**70)
+    finally:
+        structlog.reset_defaults()
+
+    (record,) = [r for r in caplog.records if r.name == "test"]
+    event = json.loads(record.getMessage())
+    assert event["d"] == {"1": 2}
+    assert event["big"] == 2**70
@@ -75,21 +75,125 @@ class TestDatabaseManager:
             indexes = [row[0] for row in await cursor.fetchall()]
 
             expected_indexes = [
-                "idx_sessions_user_id",
+                "idx_sessions_user_last_used",
+                "idx_sessions_last_used",
                 "idx_sessions_project_path",
                 "idx_messages_session_id",
                 "idx_messages_timestamp",
                 "idx_audit_log_user_id",
                 "idx_audit_log_timestamp",
                 "idx_cost_tracking_user_date",
+                "idx_users_allowed",
+                "idx_tool_usage_session_timestamp",
             ]
 
             for index in expected_indexes:
                 assert index in indexes
 
+    @pytest.mark.parametrize(
+        "query,index",
+        [
+            ("SELECT user_id FROM users WHERE is_allowed = TRUE", "idx_users_allowed"),
+            (
+                "SELECT * FROM sessions WHERE user_id = 1 ORDER BY last_used DESC",
+                "idx_sessions_user_last_used",
+            ),
+            (
+                "SELECT * FROM sessions WHERE last_used < datetime('now')",
+                "idx_sessions_last_used",
+            ),
+            (
+                "SELECT * FROM tool_usage WHERE session_id = 's' "
+                "ORDER BY timestamp DESC",
+                "idx_tool_usage_session_timestamp",
+            ),
+        ],
+    )
+    async def test_queries_use_indexes(self, db_manager, query, index):
+        """Test repository lookups are served by an index."""
+        async with db_manager.get_connection() as conn:
+            cursor = await conn.execute(f"EXPLAIN QUERY PLAN {query}")
+            plan = " ".join(row["detail"] for row in await cursor.fetchall())
+
+        assert index in plan
+        assert "TEMP B-TREE" not in plan
+
     async def test_migration_tracking(self, db_manager):
         """Test that migrations are tracked."""
         async with db_manager.get_connection() as conn:
             cursor = await conn.execute("SELECT MAX(version) FROM schema_version")
             version = await cursor.fetchone()
             assert version[0] >= 1  # At least initial migration
+
+    async def test_in_memory_database_shared_by_pool(self):
+        """Test pooled connections to :memory: see one database."""
+        manager = DatabaseManager("sqlite:///:memory:")
+        await manager.initialize()
+        try:
+            async with manager.get_connection() as conn1:
+                async with manager.get_connection() as conn2:
+                    await conn1.execute("INSERT INTO users (user_id) VALUES (1)")
+                    await conn1.commit()
+                    cursor = await conn2.execute("SELECT user_id FROM users")
+                    assert [row[0] for row in await cursor.fetchall()] == [1]
+        finally:
+            await manager.close()
+
+        # A second manager gets its own, freshly migrated database
+        other = DatabaseManager("sqlite:///:memory:")
+        await other.initialize()
+        try:
+            async with other.get_connection() as conn:
+                cursor = await conn.execute("SELECT COUNT(*) FROM users")
+                assert (await cursor.fetchone())[0] == 0
+        finally:
+            await other.close()
+
+    async def test_transaction_commits_once(self, db_manager):
+        """Test repository-style commits inside a transaction are deferred."""
+        async with db_manager.transaction() as conn:
+            async with db_manager.get_connection() as inner:
+                assert inner is conn
+                await inner.execute("INSERT INTO users (user_id) VALUES (1)")
+                await inner.commit()
+                db_manager.mark_written()
+                version_inside = db_manager.write_version
+
+        # Bumped again once the writes are really committed
+        assert db_manager.write_version > version_inside
+
+        with pytest.raises(RuntimeError):
+            async with db_manager.transaction():
+                async with db_manager.get_connection() as conn:
+                    await conn.execute("INSERT INTO users (user_id) VALUES (2)")
+                    await conn.commit()
+                raise RuntimeError("abort")
+
+        async with db_manager.get_connection() as conn:
+            cursor = await conn.execute("SELECT user_id FROM users")
+            assert [row[0] for row in await cursor.fetchall()] == [1]
+
+    async def test_connection_pragmas(self, db_manager):
+        """Test file databases use WAL with relaxed fsync on every connection."""
+        async with db_manager.get_connection() as conn:
+            cursor = await conn.execute("PRAGMA journal_mode")
+            assert (await cursor.fetchone())[0] == "wal"
+            cursor = await conn.execute("PRAGMA synchronous")
+            assert (await cursor.fetchone())[0] == 1  # NORMAL
+
+    async def test_pool_size(self, tmp_path):
+        """Test the pool keeps at most pool_size idle connections."""
+        manager = DatabaseManager(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1)
+        await manager.initialize()
+        try:
+            assert len(manager._connection_pool) == 1
+            async with manager.get_connection() as conn1:
+                async with manager.get_connection() as conn2:
+                    assert conn1 is not conn2
+                    # Overflow connections get the pragmas too
+                    cursor = await conn2.execute("PRAGMA foreign_keys")
+                    assert (await cursor.fetchone())[0] == 1
+            # The first connection back is kept, the overflow one closed
+            assert manager._connection_pool == [conn2]
+        finally:
+            await manager.close()
@@ -1,8 +1,6 @@
 """Tests for storage facade."""
 
-import tempfile
 from datetime import datetime
-from pathlib import Path
 
 import pytest
 
@@ -12,13 +10,11 @@ from src.storage.facade import Storage
 
 @pytest.fixture
 async def storage():
-    """Create test storage."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        db_path = Path(temp_dir) / "test.db"
-        storage = Storage(f"sqlite:///{db_path}")
-        await storage.initialize()
-        yield storage
-        await storage.close()
+    """Create test storage on a private in-memory database."""
+    storage = Storage("sqlite:///:memory:")
+    await storage.initialize()
+    yield storage
+    await storage.close()
 
 
 class TestStorageFacade:
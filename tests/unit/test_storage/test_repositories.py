@@ -1,8 +1,8 @@
 """Tests for repository implementations."""
 
-import tempfile
+from dataclasses import replace
 from datetime import datetime, timedelta
-from pathlib import Path
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
@@ -23,16 +23,84 @@ from src.storage.repositories import (
     UserRepository,
 )
 
+NOW = datetime.utcnow()
 
-@pytest.fixture
+# Templates specialized per test with dataclasses.replace
+_USER = UserModel(user_id=0, first_seen=NOW, last_active=NOW, is_allowed=True)
+_SESSION = SessionModel(
+    session_id="", user_id=0, project_path="", created_at=NOW, last_used=NOW
+)
+_MESSAGE = MessageModel(session_id="", user_id=0, timestamp=NOW, prompt="")
+
+
+def make_user(user_id: int, username: str, **overrides) -> UserModel:
+    """Build an allowed user seen at NOW."""
+    return replace(_USER, user_id=user_id, telegram_username=username, **overrides)
+
+
+def make_session(
+    session_id: str, user_id: int, project_path: str, **overrides
+) -> SessionModel:
+    """Build a session created and last used at NOW."""
+    return replace(
+        _SESSION,
+        session_id=session_id,
+        user_id=user_id,
+        project_path=project_path,
+        **overrides,
+    )
+
+
+def make_message(
+    session_id: str, user_id: int, prompt: str, **overrides
+) -> MessageModel:
+    """Build a message sent at NOW."""
+    return replace(
+        _MESSAGE, session_id=session_id, user_id=user_id, prompt=prompt, **overrides
+    )
+
+
+# Child tables first so foreign keys never dangle mid-cleanup
+_TABLES = (
+    "tool_usage",
+    "messages",
+    "sessions",
+    "audit_log",
+    "user_tokens",
+    "cost_tracking",
+    "users",
+)
+
+
+@pytest.fixture(scope="module")
 async def db_manager():
-    """Create test database manager."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        db_path = Path(temp_dir) / "test.db"
-        manager = DatabaseManager(f"sqlite:///{db_path}")
-        await manager.initialize()
-        yield manager
-        await manager.close()
+    """Create one in-memory test database manager for the module."""
+    # Tests run one query at a time, so a single pooled connection suffices
+    manager = DatabaseManager("sqlite:///:memory:", pool_size=1)
+    await manager.initialize()
+    yield manager
+    await manager.close()
+
+
+@pytest.fixture(autouse=True)
+async def _clean_db(db_manager):
+    """Empty every table after each test, in a single transaction."""
+    yield
+    async with db_manager.get_connection() as conn:
+        for table in _TABLES:
+            await conn.execute(f"DELETE FROM {table}")
+        await conn.commit()
+
+
+@pytest.fixture
+async def user_and_session(db_manager):
+    """Create a user and one of their sessions in a single transaction."""
+    user = make_user(12360, "fixtureuser")
+    session = make_session("fixture-session", user.user_id, "/test/fixture")
+    async with db_manager.transaction():
+        await UserRepository(db_manager).create_user(user)
+        await SessionRepository(db_manager).create_session(session)
+    return user, session
 
 
 @pytest.fixture
@@ -76,19 +144,12 @@ class TestUserRepository:
 
     async def test_create_and_get_user(self, user_repo):
         """Test creating and retrieving user."""
-        user = UserModel(
-            user_id=12345,
-            telegram_username="testuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
+        user = make_user(12345, "testuser")
 
-        # Create user
-        created_user = await user_repo.create_user(user)
-        assert created_user.user_id == 12345
+        # create_user hands back the model without re-reading it
+        assert await user_repo.create_user(user) is user
 
-        # Get user
+        # One round-trip checks what was stored
         retrieved_user = await user_repo.get_user(12345)
         assert retrieved_user is not None
         assert retrieved_user.user_id == 12345
@@ -97,14 +158,8 @@ class TestUserRepository:
 
     async def test_update_user(self, user_repo):
         """Test updating user."""
-        user = UserModel(
-            user_id=12346,
-            telegram_username="testuser2",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=False,
-            total_cost=10.5,
-            message_count=5,
+        user = make_user(
+            12346, "testuser2", is_allowed=False, total_cost=10.5, message_count=5
         )
 
         await user_repo.create_user(user)
@@ -122,23 +177,11 @@ class TestUserRepository:
     async def test_get_allowed_users(self, user_repo):
         """Test getting allowed users."""
         # Create allowed user
-        allowed_user = UserModel(
-            user_id=12347,
-            telegram_username="allowed",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
+        allowed_user = make_user(12347, "allowed")
         await user_repo.create_user(allowed_user)
 
         # Create disallowed user
-        disallowed_user = UserModel(
-            user_id=12348,
-            telegram_username="disallowed",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=False,
-        )
+        disallowed_user = make_user(12348, "disallowed", is_allowed=False)
         await user_repo.create_user(disallowed_user)
 
         # Get allowed users
@@ -146,6 +189,11 @@ class TestUserRepository:
         assert 12347 in allowed_users
         assert 12348 not in allowed_users
 
+        # Membership check without loading rows
+        assert await user_repo.is_allowed(12347) is True
+        assert await user_repo.is_allowed(12348) is False
+        assert await user_repo.is_allowed(99999) is False
+
 
 class TestSessionRepository:
     """Test session repository."""
@@ -153,31 +201,22 @@ class TestSessionRepository:
     async def test_create_and_get_session(self, session_repo, user_repo):
         """Test creating and retrieving session."""
         # Create user first
-        user = UserModel(
-            user_id=12349,
-            telegram_username="sessionuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
+        user = make_user(12349, "sessionuser")
         await user_repo.create_user(user)
 
         # Create session
-        session = SessionModel(
-            session_id="test-session-123",
-            user_id=12349,
-            project_path="/test/project",
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
+        session = make_session(
+            "test-session-123",
+            12349,
+            "/test/project",
             total_cost=5.0,
             total_turns=3,
             message_count=2,
         )
 
-        created_session = await session_repo.create_session(session)
-        assert created_session.session_id == "test-session-123"
+        assert await session_repo.create_session(session) is session
 
-        # Get session
+        # One round-trip checks what was stored
         retrieved_session = await session_repo.get_session("test-session-123")
         assert retrieved_session is not None
         assert retrieved_session.user_id == 12349
@@ -186,114 +225,82 @@ class TestSessionRepository:
     async def test_get_user_sessions(self, session_repo, user_repo):
         """Test getting user sessions."""
         # Create user
-        user = UserModel(
-            user_id=12350,
-            telegram_username="multisessionuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
+        user = make_user(12350, "multisessionuser")
         await user_repo.create_user(user)
 
         # Create multiple sessions
-        for i in range(3):
-            session = SessionModel(
-                session_id=f"test-session-{i}",
-                user_id=12350,
-                project_path=f"/test/project{i}",
-                created_at=datetime.utcnow(),
-                last_used=datetime.utcnow(),
-            )
-            await session_repo.create_session(session)
+        await session_repo.bulk_create_sessions(
+            [
+                make_session(f"test-session-{i}", 12350, f"/test/project{i}")
+                for i in range(3)
+            ]
+        )
 
         # Get user sessions
         sessions = await session_repo.get_user_sessions(12350)
         assert len(sessions) == 3
         assert all(s.user_id == 12350 for s in sessions)
+        assert await session_repo.count_user_sessions(12350) == 3
+        assert await session_repo.count_user_sessions(99999) == 0
 
     async def test_cleanup_old_sessions(self, session_repo, user_repo):
         """Test cleaning up old sessions."""
         # Create user
-        user = UserModel(
-            user_id=12351,
-            telegram_username="cleanupuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
+        user = make_user(12351, "cleanupuser")
         await user_repo.create_user(user)
 
         # Create old session
-        old_session = SessionModel(
-            session_id="old-session",
-            user_id=12351,
-            project_path="/test/old",
-            created_at=datetime.utcnow() - timedelta(days=35),
-            last_used=datetime.utcnow() - timedelta(days=35),
+        old_session = make_session(
+            "old-session",
+            12351,
+            "/test/old",
+            created_at=NOW - timedelta(days=35),
+            last_used=NOW - timedelta(days=35),
         )
         await session_repo.create_session(old_session)
 
         # Create recent session
-        recent_session = SessionModel(
-            session_id="recent-session",
-            user_id=12351,
-            project_path="/test/recent",
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
+        recent_session = make_session("recent-session", 12351, "/test/recent")
         await session_repo.create_session(recent_session)
 
         # Cleanup old sessions
         cleaned = await session_repo.cleanup_old_sessions(days=30)
         assert cleaned == 1
 
+        # Sessions already deactivated are not counted again
+        assert await session_repo.cleanup_old_sessions(days=30) == 0
+
         # Check that only recent session is active
         active_sessions = await session_repo.get_user_sessions(12351, active_only=True)
         assert len(active_sessions) == 1
         assert active_sessions[0].session_id == "recent-session"
+        assert await session_repo.count_user_sessions(12351) == 1
+        assert await session_repo.count_user_sessions(12351, active_only=False) == 2
 
 
 class TestMessageRepository:
     """Test message repository."""
 
-    async def test_save_and_get_messages(self, message_repo, session_repo, user_repo):
+    async def test_save_and_get_messages(self, message_repo, user_and_session):
         """Test saving and retrieving messages."""
-        # Setup user and session
-        user = UserModel(
-            user_id=12352,
-            telegram_username="messageuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
-        await user_repo.create_user(user)
-
-        session = SessionModel(
-            session_id="message-session",
-            user_id=12352,
-            project_path="/test/messages",
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
-        await session_repo.create_session(session)
+        user, session = user_and_session
 
         # Save message
-        message = MessageModel(
-            session_id="message-session",
-            user_id=12352,
-            timestamp=datetime.utcnow(),
-            prompt="Test prompt",
+        message = make_message(
+            session.session_id,
+            user.user_id,
+            "Test prompt",
             response="Test response",
             cost=0.05,
             duration_ms=1500,
         )
 
         message_id = await message_repo.save_message(message)
-        assert message_id is not None
 
         # Get session messages
-        messages = await message_repo.get_session_messages("message-session")
+        messages = await message_repo.get_session_messages(session.session_id)
         assert len(messages) == 1
+        assert messages[0].message_id == message_id
         assert messages[0].prompt == "Test prompt"
         assert messages[0].response == "Test response"
 
@@ -301,33 +308,18 @@ class TestMessageRepository:
 class TestToolUsageRepository:
     """Test tool usage repository."""
 
-    async def test_save_and_get_tool_usage(self, tool_repo, session_repo, user_repo):
+    async def test_save_and_get_tool_usage(
+        self, db_manager, tool_repo, user_and_session
+    ):
         """Test saving and retrieving tool usage."""
-        # Setup user and session
-        user = UserModel(
-            user_id=12353,
-            telegram_username="tooluser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
-        await user_repo.create_user(user)
-
-        session = SessionModel(
-            session_id="tool-session",
-            user_id=12353,
-            project_path="/test/tools",
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
-        await session_repo.create_session(session)
+        _, session = user_and_session
 
         # Save tool usage
         tool_usage = ToolUsageModel(
-            session_id="tool-session",
+            session_id=session.session_id,
             tool_name="Read",
             tool_input={"file_path": "/test/file.py"},
-            timestamp=datetime.utcnow(),
+            timestamp=NOW,
             success=True,
         )
 
@@ -335,48 +327,47 @@ class TestToolUsageRepository:
         assert usage_id is not None
 
         # Get session tool usage
-        usage_records = await tool_repo.get_session_tool_usage("tool-session")
+        usage_records = await tool_repo.get_session_tool_usage(session.session_id)
         assert len(usage_records) == 1
         assert usage_records[0].tool_name == "Read"
         assert usage_records[0].tool_input["file_path"] == "/test/file.py"
 
-    async def test_get_tool_stats(self, tool_repo, session_repo, user_repo):
-        """Test getting tool statistics."""
-        # Setup user and session
-        user = UserModel(
-            user_id=12354,
-            telegram_username="statsuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
-        await user_repo.create_user(user)
+        # Stored as JSON text, not as a blob
+        async with db_manager.get_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT typeof(tool_input), json_extract(tool_input, '$.file_path') "
+                "FROM tool_usage WHERE id = ?",
+                (usage_id,),
+            )
+            assert tuple(await cursor.fetchone()) == ("text", "/test/file.py")
 
-        session = SessionModel(
-            session_id="stats-session",
-            user_id=12354,
-            project_path="/test/stats",
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
-        await session_repo.create_session(session)
+    async def test_get_tool_stats(self, tool_repo, user_and_session):
+        """Test getting tool statistics."""
+        _, session = user_and_session
 
         # Create multiple tool usages
         tools = ["Read", "Write", "Read", "Edit", "Read"]
-        for tool in tools:
-            tool_usage = ToolUsageModel(
-                session_id="stats-session",
-                tool_name=tool,
-                timestamp=datetime.utcnow(),
-                success=True,
-            )
-            await tool_repo.save_tool_usage(tool_usage)
+        await tool_repo.bulk_save(
+            [
+                ToolUsageModel(
+                    session_id=session.session_id,
+                    tool_name=tool,
+                    timestamp=NOW,
+                    success=True,
+                )
+                for tool in tools
+            ]
+        )
 
         # Get tool stats
         stats = await tool_repo.get_tool_stats()
+        assert len(stats) == 3
+        assert stats[0]["tool_name"] == "Read"
 
-        # Find Read tool stats
-        read_stats = next(s for s in stats if s["tool_name"] == "Read")
+        # Filter to the Read tool in SQL
+        read_stats, *others = await tool_repo.get_tool_stats(tool_name="Read")
+        assert others == []
+        assert read_stats["tool_name"] == "Read"
         assert read_stats["usage_count"] == 3
         assert read_stats["success_count"] == 3
         assert read_stats["error_count"] == 0
@@ -386,39 +377,22 @@ class TestAnalyticsRepository:
     """Test analytics repository."""
 
     async def test_get_system_stats(
-        self, analytics_repo, message_repo, session_repo, user_repo
+        self, db_manager, analytics_repo, message_repo, user_and_session
     ):
         """Test getting system statistics."""
-        # Setup test data
-        user = UserModel(
-            user_id=12355,
-            telegram_username="analyticsuser",
-            first_seen=datetime.utcnow(),
-            last_active=datetime.utcnow(),
-            is_allowed=True,
-        )
-        await user_repo.create_user(user)
-
-        session = SessionModel(
-            session_id="analytics-session",
-            user_id=12355,
-            project_path="/test/analytics",
-            created_at=datetime.utcnow(),
-            last_used=datetime.utcnow(),
-        )
-        await session_repo.create_session(session)
+        user, session = user_and_session
 
         # Create messages
-        for i in range(3):
-            message = MessageModel(
-                session_id="analytics-session",
-                user_id=12355,
-                timestamp=datetime.utcnow(),
-                prompt=f"Test prompt {i}",
-                response=f"Test response {i}",
-                cost=0.1,
-            )
-            await message_repo.save_message(message)
+        async with db_manager.transaction():
+            for i in range(3):
+                message = make_message(
+                    session.session_id,
+                    user.user_id,
+                    f"Test prompt {i}",
+                    response=f"Test response {i}",
+                    cost=0.1,
+                )
+                await message_repo.save_message(message)
 
         # Get system stats
         stats = await analytics_repo.get_system_stats()
@@ -427,3 +401,49 @@ class TestAnalyticsRepository:
         assert stats["overall"]["total_sessions"] >= 1
         assert stats["overall"]["total_messages"] >= 3
         assert stats["overall"]["total_cost"] >= 0.3
+
+    async def test_system_stats_cached_until_write(
+        self, analytics_repo, message_repo, user_and_session
+    ):
+        """Test system stats are reused until a message write invalidates them."""
+        user, session = user_and_session
+        await message_repo.save_message(
+            make_message(session.session_id, user.user_id, "First", cost=0.1)
+        )
+
+        stats = await analytics_repo.get_system_stats()
+        stats["overall"]["total_messages"] = 99
+
+        with patch.object(
+            analytics_repo, "_query_system_stats", AsyncMock()
+        ) as query_mock:
+            cached = await analytics_repo.get_system_stats()
+        query_mock.assert_not_called()
+        assert cached["overall"]["total_messages"] == 1
+
+        await message_repo.save_message(
+            make_message(session.session_id, user.user_id, "Second", cost=0.1)
+        )
+        stats = await analytics_repo.get_system_stats()
+        assert stats["overall"]["total_messages"] == 2
+
+        analytics_repo.stats_ttl_seconds = 0
+        with patch.object(
+            analytics_repo, "_query_system_stats", AsyncMock(return_value={})
+        ) as query_mock:
+            assert await analytics_repo.get_system_stats() == {}
+        query_mock.assert_awaited_once()
+
+    async def test_every_write_invalidates_system_stats(
+        self, db_manager, user_repo, session_repo, user_and_session
+    ):
+        """Test committed writes outside messages also bump the write version."""
+        user, session = user_and_session
+
+        version = db_manager.write_version
+        await user_repo.set_user_allowed(user.user_id, False)
+        assert db_manager.write_version > version
+
+        version = db_manager.write_version
+        await session_repo.update_session(replace(session, total_turns=5))
+        assert db_manager.write_version > version
@@ -0,0 +1,119 @@
+"""Tests for SQLite audit and token storage."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.security.audit import AuditEvent
+from src.storage.database import DatabaseManager
+from src.storage.models import AuditLogModel
+from src.storage.repositories import AuditLogRepository
+from src.storage.security_storage import SQLiteAuditStorage, SQLiteTokenStorage
+
+
+@pytest.fixture
+async def db_manager():
+    """Create test database manager on a private in-memory database."""
+    manager = DatabaseManager("sqlite:///:memory:")
+    await manager.initialize()
+    yield manager
+    await manager.close()
+
+
+class TestSQLiteAuditStorage:
+    """Test SQLite audit storage."""
+
+    async def test_store_and_get_events(self, db_manager):
+        """Test events round-trip for users without a prior record."""
+        storage = SQLiteAuditStorage(db_manager)
+        now = datetime.utcnow()
+
+        await storage.store_event(
+            AuditEvent(
+                timestamp=now - timedelta(minutes=5),
+                user_id=123,
+                event_type="auth_attempt",
+                success=False,
+                details={"method": "token"},
+                ip_address="127.0.0.1",
+            )
+        )
+        await storage.store_event(
+            AuditEvent(
+                timestamp=now,
+                user_id=123,
+                event_type="security_violation",
+                success=False,
+                details={"violation_type": "path_traversal"},
+                session_id="session-1",
+                risk_level="high",
+            )
+        )
+
+        events = await storage.get_events(user_id=123)
+        assert [e.event_type for e in events] == [
+            "security_violation",
+            "auth_attempt",
+        ]
+        assert events[0].details == {"violation_type": "path_traversal"}
+        assert events[0].session_id == "session-1"
+        assert events[0].risk_level == "high"
+        assert events[1].ip_address == "127.0.0.1"
+        assert events[1].success is False
+
+        violations = await storage.get_security_violations()
+        assert len(violations) == 1
+
+        recent = await storage.get_events(start_time=now - timedelta(minutes=1))
+        assert [e.event_type for e in recent] == ["security_violation"]
+        assert await storage.get_events(user_id=456) == []
+
+    async def test_reads_repository_rows(self, db_manager):
+        """Test rows written by the audit repository are readable as events."""
+        storage = SQLiteAuditStorage(db_manager)
+        await storage.store_event(
+            AuditEvent(datetime.utcnow(), 123, "command", True, {})
+        )
+        await AuditLogRepository(db_manager).log_event(
+            AuditLogModel(
+                user_id=123,
+                event_type="file_access",
+                timestamp=datetime.utcnow(),
+                event_data={"path": "a.py"},
+            )
+        )
+
+        events = await storage.get_events(event_type="file_access")
+
+        assert events[0].details == {"path": "a.py"}
+        assert events[0].risk_level == "low"
+
+
+class TestSQLiteTokenStorage:
+    """Test SQLite token storage."""
+
+    async def test_store_replace_and_revoke(self, db_manager):
+        """Test only the newest active token is returned until revoked."""
+        storage = SQLiteTokenStorage(db_manager)
+        expires_at = datetime.utcnow() + timedelta(days=1)
+
+        assert await storage.get_user_token(123) is None
+
+        await storage.store_token(123, "first", expires_at)
+        await storage.store_token(123, "second", expires_at)
+
+        token = await storage.get_user_token(123)
+        assert token["hash"] == "second"
+        assert token["expires_at"] == expires_at
+        assert isinstance(token["created_at"], datetime)
+
+        await storage.revoke_token(123)
+        assert await storage.get_user_token(123) is None
+
+    async def test_expired_token_ignored(self, db_manager):
+        """Test expired tokens are not returned."""
+        storage = SQLiteTokenStorage(db_manager)
+
+        await storage.store_token(123, "old", datetime.utcnow() - timedelta(hours=1))
+
+        assert await storage.get_user_token(123) is None
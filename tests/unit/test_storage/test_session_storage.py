@@ -0,0 +1,125 @@
+"""Tests for SQLite session storage."""
+
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from src.claude.session import ClaudeSession
+from src.security.audit import AuditEvent
+from src.storage.database import DatabaseManager
+from src.storage.models import UserModel
+from src.storage.repositories import UserRepository
+from src.storage.security_storage import SQLiteAuditStorage
+from src.storage.session_storage import SQLiteSessionStorage
+
+
+@pytest.fixture
+async def db_manager():
+    """Create test database manager on a private in-memory database."""
+    manager = DatabaseManager("sqlite:///:memory:")
+    await manager.initialize()
+    yield manager
+    await manager.close()
+
+
+class TestSQLiteSessionStorage:
+    """Test SQLite session storage."""
+
+    async def test_save_upserts_in_place(self, db_manager):
+        """Test saving twice updates the stats but keeps the original row."""
+        storage = SQLiteSessionStorage(db_manager)
+        created_at = datetime.utcnow() - timedelta(hours=1)
+        session = ClaudeSession(
+            session_id="session-1",
+            user_id=123,
+            project_path=Path("/test/project"),
+            created_at=created_at,
+            last_used=created_at,
+        )
+
+        await storage.save_session(session)
+        await storage.save_session(
+            replace(
+                session,
+                project_path=Path("/other"),
+                created_at=datetime.utcnow(),
+                last_used=datetime.utcnow(),
+                total_cost=1.5,
+                total_turns=2,
+                message_count=3,
+            )
+        )
+
+        loaded = await storage.load_session("session-1")
+        assert loaded.project_path == Path("/test/project")
+        assert loaded.created_at == created_at
+        assert loaded.total_cost == 1.5
+        assert loaded.total_turns == 2
+        assert loaded.message_count == 3
+
+        async with db_manager.get_connection() as conn:
+            cursor = await conn.execute("SELECT COUNT(*) FROM sessions")
+            assert (await cursor.fetchone())[0] == 1
+            cursor = await conn.execute("SELECT is_allowed FROM users")
+            assert [row[0] for row in await cursor.fetchall()] == [1]
+
+    async def test_save_completes_audit_placeholder_user(self, db_manager):
+        """Test users first seen by audit storage are allowed once they save."""
+        users = UserRepository(db_manager)
+        await SQLiteAuditStorage(db_manager).store_event(
+            AuditEvent(datetime.utcnow(), 123, "auth_attempt", True, {})
+        )
+        assert await users.is_allowed(123) is False
+        assert (await users.get_user(123)).is_allowed is False
+
+        await SQLiteSessionStorage(db_manager).save_session(
+            ClaudeSession(
+                "session-1",
+                123,
+                Path("/test/project"),
+                datetime.utcnow(),
+                datetime.utcnow(),
+            )
+        )
+
+        assert await users.is_allowed(123) is True
+
+    async def test_save_keeps_existing_user_decision(self, db_manager):
+        """Test saving a session never re-allows an explicitly blocked user."""
+        users = UserRepository(db_manager)
+        await users.create_user(UserModel(user_id=123, telegram_username="blocked"))
+
+        await SQLiteSessionStorage(db_manager).save_session(
+            ClaudeSession(
+                "session-1",
+                123,
+                Path("/test/project"),
+                datetime.utcnow(),
+                datetime.utcnow(),
+            )
+        )
+
+        assert await users.is_allowed(123) is False
+        assert (await users.get_user(123)).telegram_username == "blocked"
+
+    async def test_writes_bump_write_version(self, db_manager):
+        """Test saves and deletes invalidate write-version keyed caches."""
+        storage = SQLiteSessionStorage(db_manager)
+
+        version = db_manager.write_version
+        await storage.save_session(
+            ClaudeSession(
+                "session-1",
+                123,
+                Path("/test/project"),
+                datetime.utcnow(),
+                datetime.utcnow(),
+            )
+        )
+        assert db_manager.write_version > version
+
+        version = db_manager.write_version
+        await storage.delete_session("session-1")
+        assert db_manager.write_version > version